@@ -1,21 +1,17 @@
-import pickle
+import os
+import sys
+
+from recipe_store import open_store, append_recipes
+
+# The difficulty rule is shared by the exercises and lives in the shared folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'shared'))
+from difficulty import DIFFICULTY_LEVELS, difficulty_code  # noqa: E402  (shared/difficulty.py)
 
 def calc_difficulty(cooking_time, ingredients):
     """
     Function to calculate recipe difficulty based on cooking time and number of ingredients
     """
-    num_ingredients = len(ingredients)
-    
-    if cooking_time < 10 and num_ingredients < 4:
-        difficulty = "Easy"
-    elif cooking_time < 10 and num_ingredients >= 4:
-        difficulty = "Medium"
-    elif cooking_time >= 10 and num_ingredients < 4:
-        difficulty = "Intermediate"
-    else:  # cooking_time >= 10 and num_ingredients >= 4
-        difficulty = "Hard"
-    
-    return difficulty
+    return DIFFICULTY_LEVELS[difficulty_code(cooking_time, len(ingredients))]
 
 def take_recipe():
     """
@@ -55,59 +51,33 @@ def take_recipe():
 filename = input("Enter a filename to store your recipes: ")
 
 try:
-    # Attempt to open and load existing file
-    file = open(filename, 'rb')
-    data = pickle.load(file)
-except FileNotFoundError:
-    # File not found - create new data dictionary
-    print("File not found. Creating a new recipe file.")
-    data = {
-        'recipes_list': [],
-        'all_ingredients': []
-    }
-except:
-    # Handle any other exceptions
-    print("An error occurred. Creating a new recipe file.")
-    data = {
-        'recipes_list': [],
-        'all_ingredients': []
-    }
+    # Open the recipe file, creating it if needed
+    # (files in the old pickle format are converted first)
+    file_existed = open_store(filename)
+except Exception:
+    # Never overwrite a file that cannot be read as recipes
+    print(f"An error occurred while opening {filename}. No recipes were saved.")
 else:
-    # Close the file if it was successfully opened
-    file.close()
-    print("File loaded successfully.")
-finally:
-    # Extract the values from dictionary into separate lists
-    recipes_list = data['recipes_list']
-    all_ingredients = data['all_ingredients']
-
-# Ask user how many recipes to enter
-n = int(input("How many recipes would you like to enter? "))
-
-# Loop to collect recipes
-for i in range(n):
-    print(f"\nEntering recipe {i + 1}:")
-    # Get recipe from user
-    recipe = take_recipe()
+    if file_existed:
+        print("File loaded successfully.")
+    else:
+        print("File not found. Creating a new recipe file.")
     
-    # Add recipe to recipes_list
-    recipes_list.append(recipe)
+    # Ask user how many recipes to enter
+    n = int(input("How many recipes would you like to enter? "))
     
-    # Add new ingredients to all_ingredients if not already present
-    for ingredient in recipe['ingredients']:
-        if ingredient not in all_ingredients:
-            all_ingredients.append(ingredient)
-
-# Update the data dictionary with new recipes and ingredients
-data = {
-    'recipes_list': recipes_list,
-    'all_ingredients': all_ingredients
-}
-
-# Save data to binary file
-try:
-    with open(filename, 'wb') as file:
-        pickle.dump(data, file)
-    print(f"\nRecipes successfully saved to {filename}!")
-except:
-    print(f"An error occurred while saving to {filename}.")
\ No newline at end of file
+    # Loop to collect recipes
+    for i in range(n):
+        print(f"\nEntering recipe {i + 1}:")
+        # Get recipe from user
+        recipe = take_recipe()
+        
+        # Append the recipe to the file right away, so it is kept even if
+        # the program is interrupted before the last recipe is entered
+        try:
+            append_recipes(filename, [recipe])
+        except Exception:
+            print(f"An error occurred while saving to {filename}.")
+            break
+    else:
+        print(f"\nRecipes successfully saved to {filename}!")
@@ -1,4 +1,4 @@
-import pickle
+from recipe_store import MAGIC, RecipeFile, compact_store, read_magic
 
 def display_recipe(recipe):
     """
@@ -11,15 +11,16 @@ def display_recipe(recipe):
     print(f"Difficulty level: {recipe['difficulty']}")
     print("-" * 40)
 
-def search_ingredient(data):
+def search_ingredient(recipe_file):
     """
     Function to search for recipes containing a specific ingredient
-    Takes a data dictionary as argument and allows user to search by ingredient
+    Takes an open RecipeFile as argument and allows user to search by ingredient
+    Only the index and the matching recipes are read from the file
     """
     # Display all available ingredients with numbers
     print("Available ingredients:")
     print("-" * 30)
-    all_ingredients = data['all_ingredients']
+    all_ingredients = recipe_file.ingredients()
     
     for index, ingredient in enumerate(all_ingredients):
         print(f"{index}: {ingredient}")
@@ -40,11 +41,9 @@ def search_ingredient(data):
         print(f"\nRecipes containing '{ingredient_searched}':")
         print("=" * 50)
         
-        recipes_found = False
-        for recipe in data['recipes_list']:
-            if ingredient_searched in recipe['ingredients']:
-                display_recipe(recipe)
-                recipes_found = True
+        recipes_found = recipe_file.find(ingredient_searched)
+        for recipe in recipes_found:
+            display_recipe(recipe)
         
         if not recipes_found:
             print("No recipes found with this ingredient.")
@@ -53,14 +52,19 @@ def search_ingredient(data):
 filename = input("Enter the filename that contains your recipe data: ")
 
 try:
-    # Open and load the recipe data file
-    with open(filename, 'rb') as file:
-        data = pickle.load(file)
+    # Files in an older format are converted to the indexed format once
+    if read_magic(filename) != MAGIC:
+        print("Converting the recipe file to the indexed format...")
+        compact_store(filename)
+    
+    # Open the recipe data file (memory-mapped, recipes are read on demand)
+    recipe_file = RecipeFile(filename)
         
 except FileNotFoundError:
     # Handle case when file is not found
     print(f"File '{filename}' not found. Please make sure the file exists and try again.")
     
 else:
-    # If file loaded successfully, call search_ingredient function
-    search_ingredient(data)
\ No newline at end of file
+    # If file opened successfully, call search_ingredient function
+    with recipe_file:
+        search_ingredient(recipe_file)
\ No newline at end of file
@@ -0,0 +1,345 @@
+"""
+Indexed, append-only recipe file used by recipe_input.py and recipe_search.py
+
+File layout (all integers little-endian):
+    header     magic b'RECIPES2', committed length, snapshot record count,
+               offset table position, index position, tail position,
+               tail record count (one 8-byte integer each)
+    snapshot   records written by the last compaction
+    offsets    8-byte file offset of every snapshot record, in order
+    index      8-byte number of ingredients, then one directory entry per
+               ingredient sorted by name (name position and length,
+               postings position and count), then the ingredient names,
+               then the postings: 8-byte offsets of the records using
+               each ingredient
+    tail       records appended since the last compaction
+
+Every record is a 4-byte payload length, a 4-byte CRC32 of the payload
+and the pickled recipe dictionary.
+
+Adding recipes writes their records after the committed length, flushes
+them to disk and only then moves the committed length forward. A crash
+while writing therefore leaves at most an uncommitted tail, which readers
+ignore and the next append overwrites. Adding N recipes only writes those
+N records instead of re-dumping every recipe in the file.
+
+Once COMPACT_TAIL_RECORDS recipes have been appended, compact_store()
+folds them into the snapshot and rebuilds the offsets and index, writing
+a fresh copy to a temporary file that is atomically renamed over the
+original. RecipeFile opens the file with mmap and answers ingredient
+queries through the index, reading only the matching records, so opening
+a file costs the same however many recipes it holds.
+
+Files written by earlier versions of recipe_input.py (one pickle.dump()
+of the whole data dictionary, or the unindexed b'RECIPES1' format) are
+still readable and are converted by compact_store().
+"""
+
+import mmap
+import os
+import pickle
+import struct
+import zlib
+
+MAGIC = b'RECIPES2'
+HEADER = struct.Struct('<8sQQQQQQ')
+RECORD_HEADER = struct.Struct('<II')     # payload length, CRC32 of payload
+DIRECTORY_ENTRY = struct.Struct('<QQQQ') # name position, name length, postings position, postings count
+OFFSET = struct.Struct('<Q')
+
+# Unindexed format written before the index was added: magic + committed length
+OLD_MAGIC = b'RECIPES1'
+OLD_HEADER = struct.Struct('<8sQ')
+
+# Number of appended recipes that triggers a compaction into the indexed snapshot
+COMPACT_TAIL_RECORDS = 1000
+
+
+def read_magic(filename):
+    """Return the first 8 bytes of a file, which identify its format"""
+    with open(filename, 'rb') as file:
+        return file.read(len(MAGIC))
+
+
+def encode_record(recipe):
+    """Return the bytes of one length-prefixed, checksummed recipe record"""
+    payload = pickle.dumps(recipe)
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_record(buffer, position):
+    """
+    Decode the record starting at position in a bytes-like buffer
+
+    Returns:
+        tuple: (recipe dictionary, position just after the record)
+    """
+    length, checksum = RECORD_HEADER.unpack_from(buffer, position)
+    start = position + RECORD_HEADER.size
+    payload = buffer[start:start + length]
+    if len(payload) != length or zlib.crc32(payload) != checksum:
+        raise ValueError(f"Corrupt recipe record at byte {position}")
+    return pickle.loads(payload), start + length
+
+
+def iter_record_range(buffer, start, end):
+    """Generator yielding (record position, recipe) for every record between start and end"""
+    position = start
+    while position < end:
+        recipe, next_position = decode_record(buffer, position)
+        yield position, recipe
+        position = next_position
+
+
+def iter_recipes(filename):
+    """
+    Generator yielding every committed recipe dictionary in the file, in order
+    Also reads files in the older formats
+    """
+    magic = read_magic(filename)
+    with open(filename, 'rb') as file:
+        if magic == MAGIC:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                header = HEADER.unpack_from(buffer, 0)
+                committed, offsets_pos, tail_pos = header[1], header[3], header[5]
+                for _, recipe in iter_record_range(buffer, HEADER.size, offsets_pos):
+                    yield recipe
+                for _, recipe in iter_record_range(buffer, tail_pos, committed):
+                    yield recipe
+        elif magic == OLD_MAGIC:
+            data = file.read()
+            committed = OLD_HEADER.unpack_from(data, 0)[1]
+            for _, recipe in iter_record_range(data, OLD_HEADER.size, committed):
+                yield recipe
+        else:
+            yield from pickle.load(file)['recipes_list']
+
+
+def load_recipes(filename):
+    """
+    Load a whole recipe file into the data dictionary used by the recipe scripts
+
+    Returns:
+        dict: 'recipes_list' with every recipe and 'all_ingredients' with
+        every distinct ingredient in the order it first appears
+    """
+    recipes_list = list(iter_recipes(filename))
+    all_ingredients = {}
+    for recipe in recipes_list:
+        for ingredient in recipe['ingredients']:
+            all_ingredients.setdefault(ingredient, None)
+    return {
+        'recipes_list': recipes_list,
+        'all_ingredients': list(all_ingredients)
+    }
+
+
+def sync_directory(filename):
+    """Flush a directory entry change (rename) to disk where the platform allows it"""
+    try:
+        directory = os.open(os.path.dirname(os.path.abspath(filename)), os.O_RDONLY)
+    except OSError:
+        return  # Directories cannot be opened on Windows; the rename is still atomic
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+def write_store(filename, recipes):
+    """
+    Write a complete indexed store file through a temporary file and an atomic rename
+    Readers see either the old file or the new one, never a half-written file
+    """
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, 0, 0, 0, 0, 0, 0))
+
+        # Snapshot records, remembering where each one starts
+        offsets = []
+        postings = {}
+        for recipe in recipes:
+            offsets.append(file.tell())
+            for ingredient in dict.fromkeys(recipe['ingredients']):
+                postings.setdefault(ingredient.encode('utf-8'), []).append(offsets[-1])
+            file.write(encode_record(recipe))
+
+        # Offset table
+        offsets_pos = file.tell()
+        file.write(b''.join(OFFSET.pack(offset) for offset in offsets))
+
+        # Ingredient index: directory sorted by name, then names, then postings
+        index_pos = file.tell()
+        names = sorted(postings)
+        names_pos = index_pos + OFFSET.size + DIRECTORY_ENTRY.size * len(names)
+        postings_pos = names_pos + sum(len(name) for name in names)
+
+        file.write(OFFSET.pack(len(names)))
+        for name in names:
+            file.write(DIRECTORY_ENTRY.pack(names_pos, len(name), postings_pos, len(postings[name])))
+            names_pos += len(name)
+            postings_pos += OFFSET.size * len(postings[name])
+        file.write(b''.join(names))
+        for name in names:
+            file.write(b''.join(OFFSET.pack(offset) for offset in postings[name]))
+
+        # No tail yet: the committed data ends with the index
+        tail_pos = file.tell()
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, tail_pos, len(offsets), offsets_pos, index_pos, tail_pos, 0))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_filename, filename)
+    sync_directory(filename)
+
+
+def compact_store(filename):
+    """
+    Rewrite a recipe file with all its committed recipes in the indexed snapshot
+    Converts older formats and drops any uncommitted tail
+    """
+    write_store(filename, list(iter_recipes(filename)))
+
+
+def open_store(filename):
+    """
+    Make sure an indexed recipe store exists at filename
+
+    Returns:
+        bool: True if the file already existed, False if it was created
+    """
+    if not os.path.exists(filename):
+        write_store(filename, [])
+        return False
+    if read_magic(filename) != MAGIC:
+        compact_store(filename)
+    return True
+
+
+def append_recipes(filename, recipes):
+    """
+    Append recipes to a store, committing them only once they are on disk
+    Compacts the file once enough recipes have been appended since the last compaction
+
+    Args:
+        filename (str): Store file created with open_store()
+        recipes (list): Recipe dictionaries to add
+    """
+    with open(filename, 'r+b') as file:
+        header = list(HEADER.unpack(file.read(HEADER.size)))
+        if header[0] != MAGIC:
+            raise ValueError("Not an indexed recipe store file")
+
+        # Write after the committed data, replacing any uncommitted tail
+        file.seek(header[1])
+        for recipe in recipes:
+            file.write(encode_record(recipe))
+        file.truncate()
+        file.flush()
+        os.fsync(file.fileno())
+
+        # Move the committed length forward now that the records are safe
+        header[1] = file.tell()
+        header[6] += len(recipes)
+        file.seek(0)
+        file.write(HEADER.pack(*header))
+        file.flush()
+        os.fsync(file.fileno())
+
+    if header[6] >= COMPACT_TAIL_RECORDS:
+        compact_store(filename)
+
+
+class RecipeFile:
+    """
+    Read-only, memory-mapped view of an indexed recipe store
+
+    Opening only reads the header and the few tail records appended since
+    the last compaction; ingredient lookups binary-search the index and
+    decode just the matching records.
+    """
+
+    def __init__(self, filename):
+        """
+        Open a recipe store for searching
+
+        Raises:
+            ValueError: If the file is not in the indexed store format
+        """
+        self.file = open(filename, 'rb')
+        try:
+            self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError("Not an indexed recipe store file")
+
+        if len(self.buffer) < HEADER.size or self.buffer[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError("Not an indexed recipe store file")
+        _, committed, self.snapshot_count, self.offsets_pos, index_pos, tail_pos, _ = HEADER.unpack_from(self.buffer, 0)
+
+        self.ingredient_count = OFFSET.unpack_from(self.buffer, index_pos)[0]
+        self.directory_pos = index_pos + OFFSET.size
+
+        # Recipes appended since the last compaction are not indexed yet
+        self.tail_recipes = [recipe for _, recipe in iter_record_range(self.buffer, tail_pos, committed)]
+        self.recipe_count = self.snapshot_count + len(self.tail_recipes)
+
+    def close(self):
+        """Release the memory map and the file"""
+        self.buffer.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _directory_entry(self, number):
+        """Return (name bytes, postings position, postings count) of an index entry"""
+        name_pos, name_length, postings_pos, postings_count = DIRECTORY_ENTRY.unpack_from(
+            self.buffer, self.directory_pos + number * DIRECTORY_ENTRY.size
+        )
+        return self.buffer[name_pos:name_pos + name_length], postings_pos, postings_count
+
+    def ingredients(self):
+        """Return every distinct ingredient name in alphabetical order"""
+        names = {
+            self._directory_entry(number)[0].decode('utf-8')
+            for number in range(self.ingredient_count)
+        }
+        for recipe in self.tail_recipes:
+            names.update(recipe['ingredients'])
+        return sorted(names)
+
+    def find(self, ingredient):
+        """Return every recipe using the ingredient, in the order they were added"""
+        key = ingredient.encode('utf-8')
+        found = []
+
+        # Binary search the sorted directory
+        low, high = 0, self.ingredient_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._directory_entry(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < self.ingredient_count:
+            name, postings_pos, postings_count = self._directory_entry(low)
+            if name == key:
+                for number in range(postings_count):
+                    offset = OFFSET.unpack_from(self.buffer, postings_pos + number * OFFSET.size)[0]
+                    found.append(decode_record(self.buffer, offset)[0])
+
+        found.extend(recipe for recipe in self.tail_recipes if ingredient in recipe['ingredients'])
+        return found
+
+    def recipe_at(self, number):
+        """Return the recipe at a position (0-based, in the order added) through the offset table"""
+        if number >= self.snapshot_count:
+            return self.tail_recipes[number - self.snapshot_count]
+        offset = OFFSET.unpack_from(self.buffer, self.offsets_pos + number * OFFSET.size)[0]
+        return decode_record(self.buffer, offset)[0]
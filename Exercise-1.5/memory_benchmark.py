@@ -0,0 +1,73 @@
+"""
+Memory benchmark comparing Recipe and CompactRecipe
+
+Builds the same set of synthetic recipes with both classes and reports the
+memory allocated per recipe, measured with tracemalloc. Ingredient names
+are decoded from bytes for every recipe, like recipes parsed from a file
+or database would be, so each Recipe holds its own string objects.
+
+Usage:
+    python memory_benchmark.py
+    python memory_benchmark.py --count 200000 --vocabulary 2000 --ingredients 8
+"""
+
+import argparse
+import gc
+import random
+import tracemalloc
+
+from recipe_oop import Recipe, CompactRecipe
+
+
+def make_recipe_data(count, vocabulary_size, ingredients_per_recipe, seed=42):
+    """Return (name, cooking_time, ingredient bytes list) tuples for synthetic recipes"""
+    rng = random.Random(seed)
+    vocabulary = [f"Ingredient {number}".encode() for number in range(vocabulary_size)]
+    return [
+        (f"Recipe {number}", rng.randint(1, 120), rng.sample(vocabulary, ingredients_per_recipe))
+        for number in range(count)
+    ]
+
+
+def measure(recipe_class, recipe_data):
+    """
+    Build one recipe per entry with recipe_class and return the bytes allocated per recipe
+    Recipe names are created before measuring, as both classes store them the same way
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    recipes = []
+    for name, cooking_time, ingredients in recipe_data:
+        recipe = recipe_class(name)
+        recipe.add_ingredients(*[ingredient.decode() for ingredient in ingredients])
+        recipe.set_cooking_time(cooking_time)
+        recipes.append(recipe)
+
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(recipes)
+
+
+def main():
+    """Parse command-line arguments and print the memory used per recipe"""
+    parser = argparse.ArgumentParser(description="Compare memory used per Recipe and CompactRecipe.")
+    parser.add_argument('--count', type=int, default=100000, help="Number of recipes to build")
+    parser.add_argument('--vocabulary', type=int, default=1000, help="Number of distinct ingredients")
+    parser.add_argument('--ingredients', type=int, default=6, help="Ingredients per recipe")
+    args = parser.parse_args()
+
+    recipe_data = make_recipe_data(args.count, args.vocabulary, args.ingredients)
+
+    regular = measure(Recipe, recipe_data)
+    compact = measure(CompactRecipe, recipe_data)
+
+    print(f"{args.count} recipes, {args.ingredients} ingredients each, {args.vocabulary} distinct ingredients")
+    print(f"Recipe:        {regular:8.1f} bytes per recipe")
+    print(f"CompactRecipe: {compact:8.1f} bytes per recipe")
+    print(f"Saved:         {regular - compact:8.1f} bytes per recipe ({(1 - compact / regular) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,91 @@
-class Recipe:
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+# The difficulty rule is shared by the exercises and lives in the shared folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'shared'))
+from difficulty import DIFFICULTY_LEVELS, difficulty_code  # noqa: E402  (shared/difficulty.py)
+
+NO_DIFFICULTY = 255  # code meaning the difficulty has not been calculated yet
+
+
+class IngredientRegistry:
     """
-    A class to represent a recipe with automatic difficulty calculation
+    An ordered set of ingredients with a reference count for each one
+    
+    Backed by a dictionary, so membership checks, adding and removing are
+    O(1) while iteration keeps the order in which ingredients were first added.
+    Each count is the number of recipes using the ingredient, so an
+    ingredient disappears once the last recipe using it is removed.
     """
     
+    def __init__(self):
+        """Initialize an empty IngredientRegistry object"""
+        self.counts = {}
+    
+    def add(self, ingredient):
+        """Register one more recipe using the ingredient"""
+        self.counts[ingredient] = self.counts.get(ingredient, 0) + 1
+    
+    def remove(self, ingredient):
+        """Release one recipe's use of the ingredient, dropping it when unused"""
+        count = self.counts.get(ingredient, 0) - 1
+        if count > 0:
+            self.counts[ingredient] = count
+        else:
+            self.counts.pop(ingredient, None)
+    
+    def count(self, ingredient):
+        """Return the number of recipes using the ingredient"""
+        return self.counts.get(ingredient, 0)
+    
+    def __contains__(self, ingredient):
+        return ingredient in self.counts
+    
+    def __iter__(self):
+        return iter(self.counts)
+    
+    def __len__(self):
+        return len(self.counts)
+
+
+class RecipeBase:
+    """
+    Behaviour shared by Recipe and CompactRecipe
+    
+    Subclasses decide how the ingredients and the cached difficulty are
+    stored. They provide get_ingredients(), count_ingredients(),
+    add_ingredients(), search_ingredient(), _difficulty_is_current() and
+    _set_difficulty_code(); everything else, including the difficulty rule
+    from shared/difficulty.py, lives here.
+    """
+    
+    __slots__ = ()
+    
     # Class variable to track all ingredients across all recipes
-    all_ingredients = []
+    all_ingredients = IngredientRegistry()
     
-    def __init__(self, name):
+    @property
+    def difficulty(self):
         """
-        Initialize a Recipe object
-        
-        Args:
-            name (str): The name of the recipe
+        The difficulty level, derived from cooking time and ingredients
+        Recalculated only when read after either of them changed
         """
-        self.name = name
-        self.ingredients = []
-        self.cooking_time = 0
-        self.difficulty = None
+        if not self._difficulty_is_current():
+            self.calculate_difficulty()
+        return DIFFICULTY_LEVELS[self._difficulty_code]
+    
+    @difficulty.setter
+    def difficulty(self, difficulty):
+        # A level set by hand is kept until cooking time or ingredients
+        # change; None has it recalculated when next read
+        if difficulty is None:
+            self._set_difficulty_code(NO_DIFFICULTY)
+        elif difficulty in DIFFICULTY_LEVELS:
+            self._set_difficulty_code(DIFFICULTY_LEVELS.index(difficulty))
+        else:
+            raise ValueError(f"Unknown difficulty level '{difficulty}'.")
     
     # Getter and setter methods for name
     def get_name(self):
@@ -34,8 +103,89 @@ class Recipe:
     
     def set_cooking_time(self, cooking_time):
         """Set the cooking time"""
-        self.cooking_time = cooking_time
-        self.calculate_difficulty()  # Recalculate difficulty when cooking time changes
+        self.cooking_time = cooking_time  # Difficulty is recalculated when next read
+    
+    def calculate_difficulty(self):
+        """
+        Calculate and set the difficulty of the recipe based on cooking time and ingredients
+        
+        Logic (thresholds in shared/difficulty.py):
+        - Easy: quick (under SLOW_COOKING_TIME minutes) with few ingredients (under MANY_INGREDIENTS)
+        - Medium: quick with many ingredients
+        - Intermediate: slow with few ingredients
+        - Hard: slow with many ingredients
+        """
+        self._set_difficulty_code(difficulty_code(self.cooking_time, self.count_ingredients()))
+    
+    def get_difficulty(self):
+        """
+        Get the difficulty, calculating it first if it is missing or out of date
+        """
+        return self.difficulty
+    
+    def update_all_ingredients(self, new_ingredients=None):
+        """
+        Update the class variable all_ingredients with ingredients newly added to this recipe
+        Only the new ingredients are registered, instead of re-scanning the whole recipe
+        
+        Args:
+            new_ingredients (list): Distinct ingredients this recipe did not have before,
+                or None to add the recipe's ingredients missing from all_ingredients
+                (the behaviour of the original method without arguments)
+        """
+        if new_ingredients is None:
+            new_ingredients = [
+                ingredient for ingredient in dict.fromkeys(self.get_ingredients())
+                if ingredient not in RecipeBase.all_ingredients
+            ]
+        for ingredient in new_ingredients:
+            RecipeBase.all_ingredients.add(ingredient)
+    
+    def remove_from_all_ingredients(self):
+        """
+        Release this recipe's ingredients from the class variable all_ingredients
+        Call when the recipe is removed; ingredients no other recipe uses are dropped
+        """
+        for ingredient in dict.fromkeys(self.get_ingredients()):
+            RecipeBase.all_ingredients.remove(ingredient)
+    
+    def __str__(self):
+        """
+        String representation of the recipe
+        
+        Returns:
+            str: A well-formatted string containing all recipe information
+        """
+        output = f"Recipe: {self.name}\n"
+        output += f"Cooking Time: {self.cooking_time} minutes\n"
+        output += f"Ingredients: {', '.join(self.get_ingredients())}\n"
+        output += f"Difficulty: {self.get_difficulty()}"
+        return output
+
+
+class Recipe(RecipeBase):
+    """
+    A class to represent a recipe with automatic difficulty calculation
+    """
+    
+    def __init__(self, name):
+        """
+        Initialize a Recipe object
+        
+        Args:
+            name (str): The name of the recipe
+        """
+        self.name = name
+        self.ingredients = []
+        self.cooking_time = 0
+        
+        # Cached difficulty code and the (cooking time, number of ingredients) it was calculated from
+        self._difficulty_code = NO_DIFFICULTY
+        self._difficulty_inputs = None
+    
+    def _difficulty_is_current(self):
+        """Whether the cached difficulty was calculated from the current cooking time and ingredients"""
+        return self._difficulty_inputs == (self.cooking_time, len(self.ingredients))
     
     def add_ingredients(self, *ingredients):
         """
@@ -44,42 +194,125 @@ class Recipe:
         Args:
             *ingredients: Variable number of ingredient strings
         """
+        new_ingredients = []
         for ingredient in ingredients:
+            # Duplicates of an ingredient already in the recipe are not registered again
+            if ingredient not in self.ingredients and ingredient not in new_ingredients:
+                new_ingredients.append(ingredient)
             self.ingredients.append(ingredient)
-        self.update_all_ingredients()
+        self.update_all_ingredients(new_ingredients)
     
     def get_ingredients(self):
         """Get the ingredients list"""
         return self.ingredients
     
-    def calculate_difficulty(self):
+    def count_ingredients(self):
+        """Get the number of ingredients"""
+        return len(self.ingredients)
+    
+    def _set_difficulty_code(self, code):
+        """Cache a difficulty code, remembering what it applies to (NO_DIFFICULTY to drop it)"""
+        self._difficulty_code = code
+        self._difficulty_inputs = None if code == NO_DIFFICULTY else (self.cooking_time, len(self.ingredients))
+    
+    def search_ingredient(self, ingredient):
         """
-        Calculate and set the difficulty of the recipe based on cooking time and ingredients
+        Search for an ingredient in the recipe
         
-        Logic:
-        - Easy: cooking_time < 10 minutes AND ingredients < 4
-        - Medium: cooking_time < 10 minutes AND ingredients >= 4
-        - Intermediate: cooking_time >= 10 minutes AND ingredients < 4
-        - Hard: cooking_time >= 10 minutes AND ingredients >= 4
+        Args:
+            ingredient (str): The ingredient to search for
+            
+        Returns:
+            bool: True if ingredient is found, False otherwise
         """
-        num_ingredients = len(self.ingredients)
+        return ingredient in self.ingredients
+
+
+class CompactRecipe(RecipeBase):
+    """
+    A memory-compact recipe with the same public methods as Recipe
+    
+    Meant for processes holding millions of recipes:
+    - __slots__ removes the per-instance __dict__
+    - ingredients are interned once in a class-level table and each recipe
+      only stores their ids in an array('I') (4 bytes per ingredient)
+    - difficulty is cached as a small int code (0-3) instead of a string;
+      the slot is still a full pointer, but small ints are shared objects
+      so no per-recipe string or tuple is allocated. The code is reset to
+      NO_DIFFICULTY whenever cooking time or ingredients change and
+      recalculated only when read
+    """
+    
+    __slots__ = ('name', '_cooking_time', 'ingredient_ids', '_difficulty_code')
+    
+    # Class variables interning ingredient names: name -> id and id -> name
+    ingredient_table = {}
+    ingredient_names = []
+    
+    def __init__(self, name):
+        """
+        Initialize a CompactRecipe object
         
-        if self.cooking_time < 10 and num_ingredients < 4:
-            self.difficulty = "Easy"
-        elif self.cooking_time < 10 and num_ingredients >= 4:
-            self.difficulty = "Medium"
-        elif self.cooking_time >= 10 and num_ingredients < 4:
-            self.difficulty = "Intermediate"
-        else:  # cooking_time >= 10 and num_ingredients >= 4
-            self.difficulty = "Hard"
+        Args:
+            name (str): The name of the recipe
+        """
+        self.name = name
+        self.ingredient_ids = array('I')
+        self._cooking_time = 0
+        self._difficulty_code = NO_DIFFICULTY
     
-    def get_difficulty(self):
+    @property
+    def cooking_time(self):
+        """The cooking time in minutes"""
+        return self._cooking_time
+    
+    @cooking_time.setter
+    def cooking_time(self, cooking_time):
+        self._cooking_time = cooking_time
+        self._difficulty_code = NO_DIFFICULTY  # Invalidate the cached difficulty
+    
+    def _difficulty_is_current(self):
+        """Whether a difficulty has been calculated since the last change"""
+        return self._difficulty_code != NO_DIFFICULTY
+    
+    def _set_difficulty_code(self, code):
+        """Cache a difficulty code (NO_DIFFICULTY to drop it)"""
+        self._difficulty_code = code
+    
+    @classmethod
+    def intern_ingredient(cls, ingredient):
+        """Return the id of an ingredient name, registering it on first use"""
+        ingredient_id = cls.ingredient_table.get(ingredient)
+        if ingredient_id is None:
+            ingredient_id = len(cls.ingredient_names)
+            cls.ingredient_table[ingredient] = ingredient_id
+            cls.ingredient_names.append(sys.intern(ingredient))
+        return ingredient_id
+    
+    def add_ingredients(self, *ingredients):
         """
-        Get the difficulty, calculating it first if not already done
+        Add ingredients to the recipe using variable-length arguments
+        
+        Args:
+            *ingredients: Variable number of ingredient strings
         """
-        if self.difficulty is None:
-            self.calculate_difficulty()
-        return self.difficulty
+        new_ingredients = []
+        for ingredient in ingredients:
+            ingredient_id = CompactRecipe.intern_ingredient(ingredient)
+            # Duplicates of an ingredient already in the recipe are not registered again
+            if ingredient_id not in self.ingredient_ids and ingredient not in new_ingredients:
+                new_ingredients.append(ingredient)
+            self.ingredient_ids.append(ingredient_id)
+        self._difficulty_code = NO_DIFFICULTY  # Invalidate the cached difficulty
+        self.update_all_ingredients(new_ingredients)
+    
+    def get_ingredients(self):
+        """Get the ingredients list"""
+        return [CompactRecipe.ingredient_names[ingredient_id] for ingredient_id in self.ingredient_ids]
+    
+    def count_ingredients(self):
+        """Get the number of ingredients"""
+        return len(self.ingredient_ids)
     
     def search_ingredient(self, ingredient):
         """
@@ -91,29 +324,146 @@ class Recipe:
         Returns:
             bool: True if ingredient is found, False otherwise
         """
-        return ingredient in self.ingredients
+        ingredient_id = CompactRecipe.ingredient_table.get(ingredient)
+        return ingredient_id is not None and ingredient_id in self.ingredient_ids
+
+
+class RecipeCollection:
+    """
+    A collection of recipes indexed for multi-ingredient queries
+    
+    Every recipe gets a number (its position in the collection). For each
+    ingredient, cooking time and difficulty the collection keeps a posting
+    list: an array('I') of the numbers of the matching recipes. Numbers only
+    grow, so adding a recipe appends to its lists and they stay sorted.
     
-    def update_all_ingredients(self):
+    A search starts from the smallest condition and checks its candidates
+    against the other posting lists, so only the recipes of that condition
+    are ever looked at, never the whole collection.
+    
+    The index reflects recipes as they were when added; call rebuild_index()
+    after changing recipes that are already in the collection.
+    """
+    
+    def __init__(self, recipes=()):
         """
-        Update the class variable all_ingredients with ingredients from this recipe
-        Adds ingredients that aren't already present in the class variable
+        Initialize a RecipeCollection object
+        
+        Args:
+            recipes (iterable): Recipe or CompactRecipe objects to add
         """
-        for ingredient in self.ingredients:
-            if ingredient not in Recipe.all_ingredients:
-                Recipe.all_ingredients.append(ingredient)
+        self.clear()
+        for recipe in recipes:
+            self.add(recipe)
     
-    def __str__(self):
+    def clear(self):
+        """Remove every recipe and empty the index"""
+        self.recipes = []
+        self.ingredient_postings = {}   # ingredient -> ascending array of recipe numbers
+        self.time_postings = {}         # cooking time -> ascending array of recipe numbers
+        self.sorted_times = []          # distinct cooking times in ascending order
+        self.difficulty_postings = {}   # difficulty -> ascending array of recipe numbers
+    
+    def add(self, recipe):
+        """Add a recipe to the collection and index it"""
+        number = len(self.recipes)
+        self.recipes.append(recipe)
+        
+        for ingredient in set(recipe.get_ingredients()):
+            self.ingredient_postings.setdefault(ingredient, array('I')).append(number)
+        
+        cooking_time = recipe.get_cooking_time()
+        if cooking_time not in self.time_postings:
+            self.sorted_times.insert(bisect_left(self.sorted_times, cooking_time), cooking_time)
+            self.time_postings[cooking_time] = array('I')
+        self.time_postings[cooking_time].append(number)
+        
+        self.difficulty_postings.setdefault(recipe.get_difficulty(), array('I')).append(number)
+    
+    def rebuild_index(self):
+        """Rebuild the whole index from the current state of the recipes"""
+        recipes = self.recipes
+        self.clear()
+        for recipe in recipes:
+            self.add(recipe)
+    
+    def __len__(self):
+        return len(self.recipes)
+    
+    @staticmethod
+    def _filter(candidates, postings_lists, keep):
         """
-        String representation of the recipe
+        Return the candidate numbers that are (keep=True) or aren't (keep=False)
+        in at least one of the posting lists, keeping their order
+        """
+        total = sum(len(postings) for postings in postings_lists)
+        if len(candidates) * len(postings_lists) * 16 < total:
+            # Few candidates: binary search each one in the lists
+            def found(number):
+                for postings in postings_lists:
+                    position = bisect_left(postings, number)
+                    if position < len(postings) and postings[position] == number:
+                        return True
+                return False
+        else:
+            # Lists not much longer than the candidates: one set lookup each
+            members = set().union(*postings_lists)
+            found = members.__contains__
+        return [number for number in candidates if found(number) == keep]
+    
+    def search(self, all_of=(), any_of=(), none_of=(), min_time=None, max_time=None, difficulty=None):
+        """
+        Return the recipes matching every given condition, in the order they were added
         
+        Args:
+            all_of (iterable): Ingredients that must all be present (AND)
+            any_of (iterable): Ingredients of which at least one must be present (OR)
+            none_of (iterable): Ingredients that must not be present (NOT)
+            min_time (int): Minimum cooking time in minutes (inclusive)
+            max_time (int): Maximum cooking time in minutes (inclusive)
+            difficulty (str or iterable): Allowed difficulty level(s)
+            
         Returns:
-            str: A well-formatted string containing all recipe information
+            list: The matching recipes
         """
-        output = f"Recipe: {self.name}\n"
-        output += f"Cooking Time: {self.cooking_time} minutes\n"
-        output += f"Ingredients: {', '.join(self.ingredients)}\n"
-        output += f"Difficulty: {self.get_difficulty()}"
-        return output
+        empty = array('I')
+        
+        # Each condition is a group of posting lists; a recipe must be in
+        # at least one list of every group
+        groups = [[self.ingredient_postings.get(ingredient, empty)] for ingredient in all_of]
+        
+        any_of = list(any_of)
+        if any_of:
+            groups.append([self.ingredient_postings.get(ingredient, empty) for ingredient in any_of])
+        
+        if min_time is not None or max_time is not None:
+            # Distinct cooking times in the range, found by binary search
+            start = 0 if min_time is None else bisect_left(self.sorted_times, min_time)
+            end = len(self.sorted_times) if max_time is None else bisect_right(self.sorted_times, max_time)
+            groups.append([self.time_postings[cooking_time] for cooking_time in self.sorted_times[start:end]])
+        
+        if difficulty is not None:
+            levels = [difficulty] if isinstance(difficulty, str) else difficulty
+            groups.append([self.difficulty_postings.get(level, empty) for level in levels])
+        
+        if groups:
+            # Start from the condition matching the fewest recipes
+            groups.sort(key=lambda group: sum(len(postings) for postings in group))
+            first = groups[0]
+            candidates = first[0] if len(first) == 1 else sorted(set().union(*first))
+            for group in groups[1:]:
+                if not candidates:
+                    break
+                candidates = self._filter(candidates, group, keep=True)
+        else:
+            candidates = range(len(self.recipes))
+        
+        excluded = [self.ingredient_postings[ingredient] for ingredient in none_of
+                    if ingredient in self.ingredient_postings]
+        if excluded and candidates:
+            candidates = self._filter(candidates, excluded, keep=False)
+        
+        return [self.recipes[number] for number in candidates]
 
 
 def recipe_search(data, search_term):
@@ -121,7 +471,7 @@ def recipe_search(data, search_term):
     Search for recipes containing a specific ingredient
     
     Args:
-        data (list): A list of Recipe objects to search from
+        data (list): A list of Recipe (or CompactRecipe) objects to search from
         search_term (str): The ingredient to be searched for
     """
     print(f"Recipes containing '{search_term}':")
@@ -193,6 +543,15 @@ if __name__ == "__main__":
     recipe_search(recipes_list, "Bananas")
     print()
     
+    # Combined search through an indexed collection
+    collection = RecipeCollection(recipes_list)
+    print("Recipes with Sugar and Milk but no Eggs, ready in 10 minutes or less:")
+    print("=" * 40)
+    for recipe in collection.search(all_of=["Sugar", "Milk"], none_of=["Eggs"], max_time=10):
+        print(recipe)
+        print("-" * 40)
+    print()
+    
     # Display all ingredients across all recipes
     print("All ingredients used across all recipes:")
     print(", ".join(Recipe.all_ingredients))
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+EXPLAIN-based check that the common recipe queries use the Recipes indexes
+
+Runs EXPLAIN for each query and reports the indexes MySQL would use.
+Exits with status 1 when a query doesn't use the index it should.
+
+Usage:
+    python check_indexes.py
+
+Run it against a populated database: on nearly empty tables the
+optimizer may rightly prefer a full table scan.
+"""
+
+import sys
+
+from recipe_mysql import init_database, pool
+
+# (description, query, expected index name) of the common queries
+COMMON_QUERIES = (
+    ("Recipe by name",
+     "SELECT * FROM Recipes WHERE name = 'Tea'",
+     'ix_recipes_name'),
+    ("Recipes by difficulty",
+     "SELECT * FROM Recipes WHERE difficulty = 'Hard'",
+     'ix_recipes_difficulty_cooking_time'),
+    ("Recipes by difficulty and maximum cooking time",
+     "SELECT * FROM Recipes WHERE difficulty = 'Easy' AND cooking_time <= 5",
+     'ix_recipes_difficulty_cooking_time'),
+    ("Recipes by cooking time range",
+     "SELECT * FROM Recipes WHERE cooking_time BETWEEN 100 AND 110",
+     'ix_recipes_cooking_time'),
+    ("Recipes by words in the name",
+     "SELECT * FROM Recipes WHERE MATCH (name) AGAINST ('Tea' IN BOOLEAN MODE)",
+     'ix_recipes_name_fulltext'),
+)
+
+
+def explain(cursor, query):
+    """Return the set of index names MySQL plans to use for a query"""
+    cursor.execute("EXPLAIN " + query)
+    key_column = [column[0] for column in cursor.description].index('key')
+    return {name for row in cursor.fetchall() if row[key_column] for name in row[key_column].split(',')}
+
+
+def check_indexes():
+    """
+    Print the plan of every common query
+
+    Returns:
+        bool: True if every query uses its expected index
+    """
+    all_used = True
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            for description, query, expected_index in COMMON_QUERIES:
+                used = explain(cursor, query)
+                status = "OK" if expected_index in used else "MISSING"
+                all_used = all_used and expected_index in used
+                print(f"{status:8}{description}: uses {', '.join(sorted(used)) or 'no index'} (expects {expected_index})")
+        finally:
+            cursor.close()
+    return all_used
+
+
+if __name__ == "__main__":
+    init_database()
+    ok = check_indexes()
+    pool.dispose()
+    if not ok:
+        sys.exit(1)
@@ -0,0 +1,197 @@
+"""
+A small thread-safe connection pool for DB-API connections
+
+The pool does not know which database it talks to: it is given a function
+that opens a new connection. recipe_mysql.py passes one that calls
+mysql.connector.connect(), while a local stand-in can be used for testing:
+
+    import sqlite3
+    pool = ConnectionPool(lambda: sqlite3.connect('test.db', check_same_thread=False))
+    with pool.connection() as conn:
+        conn.execute("SELECT 1")
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+
+class ConnectionPool:
+    """
+    A pool of reusable database connections
+
+    Up to pool_size idle connections are kept open for reuse. Under load
+    up to max_overflow extra connections are opened, and closed again when
+    they are released. Connections older than recycle seconds are replaced,
+    and with pre_ping each connection is checked with a SELECT 1 before it
+    is handed out, so dropped connections are never returned to callers.
+    After dispose() the pool opens fresh connections, and connections that
+    were checked out before it are closed when they are released.
+    """
+
+    def __init__(self, connect, pool_size=5, max_overflow=10, timeout=30, recycle=3600, pre_ping=True):
+        """
+        Initialize a ConnectionPool object
+
+        Args:
+            connect (callable): Function returning a new DB-API connection
+            pool_size (int): Number of idle connections kept for reuse
+            max_overflow (int): Extra connections allowed beyond pool_size
+            timeout (float): Seconds to wait for a free connection
+            recycle (float): Seconds after which a connection is replaced,
+                or None to keep connections forever
+            pre_ping (bool): Check connections with a ping before handing them out
+        """
+        self.connect = connect
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._idle = deque()       # (connection, created_at) pairs ready for reuse
+        self._created = {}         # id(connection) -> (created_at, generation) for checked-out connections
+        self._open_count = 0
+        self._generation = 0       # bumped by dispose(); older connections are not reused
+        self._condition = threading.Condition()
+
+    def _open(self):
+        """Open a new connection (called with a slot already reserved)"""
+        try:
+            return self.connect(), time.monotonic()
+        except Exception:
+            with self._condition:
+                self._open_count -= 1
+                self._condition.notify()
+            raise
+
+    def _discard(self, conn):
+        """Close a connection, ignoring errors from already broken ones"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_alive(self, conn):
+        """Return True if the connection still answers a simple query"""
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        """
+        Check out a connection, reusing an idle one when possible
+
+        Returns:
+            A DB-API connection which must be given back with release()
+
+        Raises:
+            PoolTimeoutError: If the pool is exhausted for longer than the timeout
+        """
+        deadline = time.monotonic() + self.timeout
+
+        while True:
+            with self._condition:
+                while not self._idle and self._open_count >= self.pool_size + self.max_overflow:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"No connection available after {self.timeout} seconds "
+                            f"(pool_size={self.pool_size}, max_overflow={self.max_overflow})"
+                        )
+                    self._condition.wait(remaining)
+
+                if self._idle:
+                    conn, created_at = self._idle.pop()
+                else:
+                    # Reserve a slot, then connect outside the lock
+                    self._open_count += 1
+                    conn = None
+
+            if conn is None:
+                conn, created_at = self._open()
+            else:
+                expired = self.recycle is not None and time.monotonic() - created_at > self.recycle
+                if expired or (self.pre_ping and not self._is_alive(conn)):
+                    # Replace the stale connection, keeping its slot
+                    self._discard(conn)
+                    conn, created_at = self._open()
+
+            with self._condition:
+                self._created[id(conn)] = (created_at, self._generation)
+            return conn
+
+    def release(self, conn):
+        """
+        Give a checked-out connection back to the pool
+
+        Any uncommitted work is rolled back so the next user starts clean.
+        Overflow connections beyond pool_size, and connections checked out
+        before the last dispose(), are closed instead of kept.
+        """
+        with self._condition:
+            checkout = self._created.pop(id(conn), None)
+        if checkout is None:
+            raise ValueError("Connection was not checked out from this pool")
+        created_at, generation = checkout
+
+        try:
+            conn.rollback()
+            reusable = True
+        except Exception:
+            reusable = False
+
+        with self._condition:
+            reusable = reusable and generation == self._generation
+            if reusable and len(self._idle) < self.pool_size:
+                self._idle.append((conn, created_at))
+                conn = None
+            else:
+                self._open_count -= 1
+            self._condition.notify()
+
+        if conn is not None:
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager that acquires a connection and always releases it"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def dispose(self):
+        """Close every idle connection (checked-out ones are closed on release)"""
+        with self._condition:
+            self._generation += 1
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open_count -= len(idle)
+            self._condition.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def status(self):
+        """Return a dictionary with the current pool usage"""
+        with self._condition:
+            return {
+                'open': self._open_count,
+                'idle': len(self._idle),
+                'checked_out': len(self._created),
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow
+            }
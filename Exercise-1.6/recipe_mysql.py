@@ -1,33 +1,249 @@
+import os
+import sys
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import wraps
+from itertools import islice
+
 import mysql.connector
+from mysql.connector.constants import ClientFlag
+
+from connection_pool import ConnectionPool
+
+# Modules shared by the exercises (the difficulty rule and the search result cache) live in the shared folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'shared'))
+from difficulty import (  # noqa: E402  (shared/difficulty.py)
+    DIFFICULTY_LEVELS, SLOW_COOKING_TIME, MANY_INGREDIENTS, difficulty_code, difficulty_codes
+)
+from recipe_cache import SearchResultCache  # noqa: E402  (shared/recipe_cache.py)
 
-# Initialize connection object
-conn = mysql.connector.connect(
-    host='localhost',
-    user='admin',
-    passwd='admin'
+# Database connection details
+DB_HOST = 'localhost'
+DB_USER = 'admin'
+DB_PASSWORD = 'admin'
+DB_NAME = 'task_database'
+
+# Connection pool settings
+POOL_SIZE = 5          # idle connections kept open for reuse
+POOL_MAX_OVERFLOW = 10 # extra connections allowed under load
+POOL_TIMEOUT = 30      # seconds to wait for a free connection
+POOL_RECYCLE = 3600    # seconds before a connection is replaced
+POOL_PRE_PING = True   # check connections before handing them out
+
+# Secondary indexes on Recipes as (name, definition); init_database() adds missing ones
+# The composite index also serves queries on difficulty alone
+RECIPE_INDEXES = (
+    ('ix_recipes_name', 'INDEX ix_recipes_name (name)'),
+    ('ix_recipes_cooking_time', 'INDEX ix_recipes_cooking_time (cooking_time)'),
+    ('ix_recipes_difficulty_cooking_time', 'INDEX ix_recipes_difficulty_cooking_time (difficulty, cooking_time)'),
+    ('ix_recipes_name_fulltext', 'FULLTEXT INDEX ix_recipes_name_fulltext (name)'),
 )
 
-# Initialize cursor object
-cursor = conn.cursor()
+# Ingredient search result cache, shared between processes through a
+# SQLite file when RECIPE_SEARCH_CACHE names one
+SEARCH_CACHE_SIZE = 256  # searches kept in the cache
+search_cache = SearchResultCache(max_size=SEARCH_CACHE_SIZE, path=os.environ.get('RECIPE_SEARCH_CACHE'))
+
+def normalize_ingredients(ingredients):
+    """
+    Return the distinct, stripped, non-empty ingredient names from a list, keeping order
+    
+    Entries are split on commas first ("Salt, Pepper" is two ingredients).
+    Every write path stores, counts and catalogs the returned list, so the
+    number of ingredients is the same whether it is counted in Python, from
+    the catalog or by DIFFICULTY_SQL from the commas of the stored string.
+    Names differing only in case count as one ingredient (the first spelling
+    is kept), as the default MySQL collation of the catalog key compares them.
+    """
+    normalized = []
+    seen = set()
+    for entry in ingredients:
+        for ingredient in entry.split(','):
+            ingredient = ingredient.strip()
+            if ingredient and ingredient.casefold() not in seen:
+                seen.add(ingredient.casefold())
+                normalized.append(ingredient)
+    return normalized
+
+def parse_ingredients(ingredients_str):
+    """
+    Split a comma-separated ingredients string into distinct ingredient names
+    
+    Args:
+        ingredients_str (str): Ingredients as stored in the Recipes table
+    
+    Returns:
+        list: Stripped, non-empty ingredient names without duplicates
+    """
+    return normalize_ingredients([ingredients_str or ""])
+
+def adjust_catalog(cursor, counts):
+    """
+    Add a (possibly negative) count to each ingredient of the catalog in one executemany
+    New ingredients are inserted and ones no longer used are dropped
+    The caller is responsible for committing the transaction
+    
+    Args:
+        cursor: Database cursor
+        counts (dict): Ingredient name -> change in number of recipes
+    """
+    counts = {ingredient: count for ingredient, count in counts.items() if count}
+    if not counts:
+        return
+    
+    cursor.executemany("""
+    INSERT INTO Ingredients (name, recipe_count) VALUES (%s, %s)
+    ON DUPLICATE KEY UPDATE recipe_count = recipe_count + VALUES(recipe_count)
+    """, list(counts.items()))
+    
+    # Only the decreased ingredients can have dropped to zero; naming them
+    # keeps the DELETE on their primary key rows instead of scanning and
+    # locking the whole catalog
+    decreased = [ingredient for ingredient, count in counts.items() if count < 0]
+    if decreased:
+        placeholders = ", ".join(["%s"] * len(decreased))
+        cursor.execute(
+            f"DELETE FROM Ingredients WHERE name IN ({placeholders}) AND recipe_count <= 0",
+            decreased
+        )
+
+def add_to_catalog(cursor, ingredients):
+    """
+    Increase the recipe count of each ingredient, adding new ones to the catalog
+    The caller is responsible for committing the transaction
+    """
+    adjust_catalog(cursor, {ingredient: 1 for ingredient in ingredients})
+
+def remove_from_catalog(cursor, ingredients):
+    """
+    Decrease the recipe count of each ingredient, dropping ones no longer used
+    The caller is responsible for committing the transaction
+    """
+    adjust_catalog(cursor, {ingredient: -1 for ingredient in ingredients})
+
+def rebuild_catalog(conn, cursor):
+    """
+    Rebuild the Ingredients catalog from scratch by scanning the Recipes table
+
+    The counts go through adjust_catalog()'s upsert, so spellings differing
+    only in case (one row under the case-insensitive key) add up instead of
+    failing on the duplicate key.
+    """
+    cursor.execute("DELETE FROM Ingredients")
+    cursor.execute("SELECT ingredients FROM Recipes")
+    counts = {}
+    for (ingredients_str,) in cursor.fetchall():
+        for ingredient in parse_ingredients(ingredients_str):
+            counts[ingredient] = counts.get(ingredient, 0) + 1
+    adjust_catalog(cursor, counts)
+    conn.commit()
 
-# Create database if it doesn't exist
-cursor.execute("CREATE DATABASE IF NOT EXISTS task_database")
+def init_database():
+    """
+    Create the database and tables and backfill the catalog (the migrate/init step)
+    Run once before using a new database; safe to run again
+    """
+    # Initialize setup connection object (used only for creating the schema)
+    conn = mysql.connector.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        passwd=DB_PASSWORD
+    )
+    
+    # Initialize cursor object
+    cursor = conn.cursor()
+    
+    # Create database if it doesn't exist
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME}")
+    
+    # Access the database
+    cursor.execute(f"USE {DB_NAME}")
+    
+    # Create Recipes table if it doesn't exist
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Recipes (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(50),
+        ingredients VARCHAR(255),
+        cooking_time INT,
+        difficulty VARCHAR(20)
+    )
+    """)
+    
+    # Add the secondary indexes the Recipes table doesn't have yet
+    cursor.execute(
+        "SELECT DISTINCT index_name FROM information_schema.statistics "
+        "WHERE table_schema = %s AND table_name = 'Recipes'",
+        (DB_NAME,)
+    )
+    existing_indexes = {index_name for (index_name,) in cursor.fetchall()}
+    for index_name, definition in RECIPE_INDEXES:
+        if index_name not in existing_indexes:
+            cursor.execute(f"ALTER TABLE Recipes ADD {definition}")
+    
+    # Create Ingredients catalog table if it doesn't exist
+    # Holds every distinct ingredient with the number of recipes using it, kept
+    # up to date on every insert/update/delete so listing ingredients never has
+    # to scan the Recipes table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Ingredients (
+        name VARCHAR(255) PRIMARY KEY,
+        recipe_count INT NOT NULL DEFAULT 0
+    )
+    """)
+    
+    # Backfill the catalog for recipes stored before it existed
+    cursor.execute("SELECT EXISTS(SELECT 1 FROM Ingredients), EXISTS(SELECT 1 FROM Recipes)")
+    catalog_filled, recipes_stored = cursor.fetchone()
+    if recipes_stored and not catalog_filled:
+        rebuild_catalog(conn, cursor)
+    
+    # Setup is done, the other functions get their connections from the pool
+    cursor.close()
+    conn.close()
+    
+    print("Database and table setup completed successfully!")
 
-# Access the database
-cursor.execute("USE task_database")
+def open_connection():
+    """
+    Open a new connection to the recipe database
+    With FOUND_ROWS an UPDATE reports the rows it matched, not only the ones
+    it changed, so a rowcount of 0 means that no recipe has the id
+    """
+    return mysql.connector.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        passwd=DB_PASSWORD,
+        database=DB_NAME,
+        client_flags=[ClientFlag.FOUND_ROWS]
+    )
 
-# Create Recipes table if it doesn't exist
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS Recipes (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    name VARCHAR(50),
-    ingredients VARCHAR(255),
-    cooking_time INT,
-    difficulty VARCHAR(20)
+# Initialize connection pool (connections are only opened when first acquired)
+pool = ConnectionPool(
+    open_connection,
+    pool_size=POOL_SIZE,
+    max_overflow=POOL_MAX_OVERFLOW,
+    timeout=POOL_TIMEOUT,
+    recycle=POOL_RECYCLE,
+    pre_ping=POOL_PRE_PING
 )
-""")
 
-print("Database and table setup completed successfully!")
+def with_pooled_connection(function):
+    """
+    Decorator that runs a function with a connection and cursor from the pool
+    
+    The decorated function is called without its conn and cursor arguments;
+    the connection is released back to the pool when it returns.
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                return function(conn, cursor, *args, **kwargs)
+            finally:
+                cursor.close()
+    return wrapper
 
 def calculate_difficulty(cooking_time, ingredients):
     """
@@ -40,20 +256,260 @@ def calculate_difficulty(cooking_time, ingredients):
     Returns:
         str: Difficulty level (Easy, Medium, Intermediate, or Hard)
     """
-    num_ingredients = len(ingredients)
+    return DIFFICULTY_LEVELS[difficulty_code(cooking_time, len(ingredients))]
+
+# Number of ingredients in the stored comma-separated ingredients string
+INGREDIENT_COUNT_SQL = (
+    "(CASE WHEN ingredients IS NULL OR ingredients = '' THEN 0 "
+    "ELSE CHAR_LENGTH(ingredients) - CHAR_LENGTH(REPLACE(ingredients, ',', '')) + 1 END)"
+)
+
+# Same rule as calculate_difficulty(), evaluated by MySQL on the stored columns
+# (built from the thresholds and names in shared/difficulty.py)
+DIFFICULTY_SQL = f"""
+    CASE
+        WHEN cooking_time >= {SLOW_COOKING_TIME} AND {INGREDIENT_COUNT_SQL} >= {MANY_INGREDIENTS} THEN '{DIFFICULTY_LEVELS[3]}'
+        WHEN cooking_time >= {SLOW_COOKING_TIME} THEN '{DIFFICULTY_LEVELS[2]}'
+        WHEN {INGREDIENT_COUNT_SQL} >= {MANY_INGREDIENTS} THEN '{DIFFICULTY_LEVELS[1]}'
+        ELSE '{DIFFICULTY_LEVELS[0]}'
+    END"""
+
+# Columns update_recipe_columns() may change
+UPDATABLE_COLUMNS = ('name', 'ingredients', 'cooking_time')
+
+def update_recipe_columns(cursor, recipe_id, changes):
+    """
+    Set columns of a recipe and recompute its difficulty in the same UPDATE statement
     
-    if cooking_time < 10 and num_ingredients < 4:
-        difficulty = "Easy"
-    elif cooking_time < 10 and num_ingredients >= 4:
-        difficulty = "Medium"
-    elif cooking_time >= 10 and num_ingredients < 4:
-        difficulty = "Intermediate"
-    else:  # cooking_time >= 10 and num_ingredients >= 4
-        difficulty = "Hard"
+    MySQL evaluates single-table UPDATE assignments from left to right, so
+    the difficulty expression already sees the new values of the columns.
     
-    return difficulty
+    Args:
+        changes (dict): New value of each column to change
+    
+    Returns:
+        int: Number of rows matched (0 if no recipe has this id)
+    """
+    for column in changes:
+        if column not in UPDATABLE_COLUMNS:
+            raise ValueError(f"Column '{column}' cannot be updated.")
+    
+    assignments = "".join(f"{column} = %s, " for column in changes)
+    update_query = f"UPDATE Recipes SET {assignments}difficulty = {DIFFICULTY_SQL} WHERE id = %s"
+    cursor.execute(update_query, (*changes.values(), recipe_id))
+    return cursor.rowcount
+
+# Recipe Service
+# Plain functions of the recipe operations, used by the menu below and
+# usable from scripts, batch jobs and load tests without a terminal
+
+# Plain recipe row returned by RecipeService
+RecipeRecord = namedtuple('RecipeRecord', ['id', 'name', 'ingredients', 'cooking_time', 'difficulty'])
+
+RECIPE_COLUMNS = "id, name, ingredients, cooking_time, difficulty"
 
-def create_recipe(conn, cursor):
+class RecipeService:
+    """
+    Recipe operations taking plain arguments and returning RecipeRecords
+    
+    Every call runs in its own transaction on a connection borrowed from
+    the pool. Nothing is read from input() or printed: invalid arguments
+    raise ValueError and database errors are raised as mysql.connector.Error
+    after the transaction is rolled back.
+    """
+    
+    def __init__(self, connection_pool):
+        """
+        Initialize a RecipeService object
+        
+        Args:
+            connection_pool (ConnectionPool): Pool the connections are borrowed from
+        """
+        self.pool = connection_pool
+    
+    @contextmanager
+    def transaction(self):
+        """Context manager yielding a cursor; commits on success and rolls back on error"""
+        with self.pool.connection() as conn:
+            # Buffered, so single-row lookups can be followed by other statements
+            cursor = conn.cursor(buffered=True)
+            try:
+                yield cursor
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+    
+    @staticmethod
+    def check_name(name):
+        """Raise ValueError unless the name fits the name column"""
+        if not name or len(name) > 50:
+            raise ValueError("Recipe name must be between 1 and 50 characters.")
+    
+    @staticmethod
+    def check_cooking_time(cooking_time):
+        """Raise ValueError unless the cooking time is a non-negative whole number of minutes"""
+        if not isinstance(cooking_time, int) or isinstance(cooking_time, bool) or cooking_time < 0:
+            raise ValueError("Cooking time must be a non-negative whole number of minutes.")
+    
+    def create(self, name, cooking_time, ingredients):
+        """
+        Store a new recipe with its difficulty
+        
+        Args:
+            name (str): The name of the recipe (50 characters or less)
+            cooking_time (int): Cooking time in minutes
+            ingredients (list): List of ingredient strings
+        
+        Returns:
+            RecipeRecord: The stored recipe
+        """
+        self.check_name(name)
+        self.check_cooking_time(cooking_time)
+        ingredients = normalize_ingredients(ingredients)
+        difficulty = calculate_difficulty(cooking_time, ingredients)
+        ingredients_str = ", ".join(ingredients)
+        
+        with self.transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO Recipes (name, ingredients, cooking_time, difficulty) VALUES (%s, %s, %s, %s)",
+                (name, ingredients_str, cooking_time, difficulty)
+            )
+            recipe_id = cursor.lastrowid
+            add_to_catalog(cursor, ingredients)
+        search_cache.bump_generation()
+        return RecipeRecord(recipe_id, name, ingredients_str, cooking_time, difficulty)
+    
+    def get(self, recipe_id):
+        """Return the recipe with the given id, or None if there is no such recipe"""
+        with self.transaction() as cursor:
+            cursor.execute(f"SELECT {RECIPE_COLUMNS} FROM Recipes WHERE id = %s", (recipe_id,))
+            row = cursor.fetchone()
+        return RecipeRecord(*row) if row else None
+    
+    def list(self, after_id=0, limit=None):
+        """
+        Return recipes ordered by id
+        
+        Args:
+            after_id (int): Only return recipes with a larger id (keyset paging)
+            limit (int): Maximum number of recipes returned, or None for all
+        """
+        query = f"SELECT {RECIPE_COLUMNS} FROM Recipes WHERE id > %s ORDER BY id"
+        params = (after_id,)
+        if limit is not None:
+            query += " LIMIT %s"
+            params += (limit,)
+        with self.transaction() as cursor:
+            cursor.execute(query, params)
+            return [RecipeRecord(*row) for row in cursor.fetchall()]
+    
+    def ingredients(self):
+        """Return (ingredient, recipe_count) pairs from the catalog, ordered by name"""
+        with self.transaction() as cursor:
+            cursor.execute("SELECT name, recipe_count FROM Ingredients ORDER BY name")
+            return cursor.fetchall()
+    
+    def search(self, ingredient):
+        """
+        Return the recipes having the given ingredient
+        
+        The stored list and the pattern are both delimited by ", ", so
+        "Salt" finds recipes with Salt but not ones with only "Salted butter".
+        Served from the search cache while no recipe has been written since.
+        """
+        ingredient = ingredient.strip()
+        # Wildcards in the name are matched literally
+        escaped = ingredient.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+        
+        def run_search():
+            with self.transaction() as cursor:
+                search_query = (
+                    f"SELECT {RECIPE_COLUMNS} FROM Recipes "
+                    "WHERE CONCAT(', ', ingredients, ', ') LIKE %s ESCAPE '!'"
+                )
+                cursor.execute(search_query, (f"%, {escaped}, %",))
+                return [tuple(row) for row in cursor.fetchall()]
+        
+        # Plain tuples are cached, so other processes can read them back
+        rows = search_cache.get(search_cache.make_text_key(ingredient), run_search)
+        return [RecipeRecord(*row) for row in rows]
+    
+    def update(self, recipe_id, name=None, cooking_time=None, ingredients=None):
+        """
+        Change the given attributes of a recipe; the difficulty is recomputed by the same UPDATE
+        
+        Changing the name or cooking time is that single UPDATE statement.
+        New ingredients first lock the row to read the old ones, whose
+        catalog counts move to the new ones.
+        
+        Returns:
+            bool: True if the recipe was updated, False if no recipe has this id
+        """
+        changes = {}
+        if name is not None:
+            self.check_name(name)
+            changes['name'] = name
+        if cooking_time is not None:
+            self.check_cooking_time(cooking_time)
+            changes['cooking_time'] = cooking_time
+        if ingredients is not None:
+            changes['ingredients'] = ", ".join(normalize_ingredients(ingredients))
+        if not changes:
+            raise ValueError("Nothing to update.")
+        
+        with self.transaction() as cursor:
+            if 'ingredients' in changes:
+                # Lock the row and read the ingredients the catalog counts belong to
+                cursor.execute("SELECT ingredients FROM Recipes WHERE id = %s FOR UPDATE", (recipe_id,))
+                row = cursor.fetchone()
+                if row is None:
+                    return False
+                update_recipe_columns(cursor, recipe_id, changes)
+                
+                # Move the catalog counts from the old ingredients to the new ones
+                remove_from_catalog(cursor, parse_ingredients(row[0]))
+                add_to_catalog(cursor, parse_ingredients(changes['ingredients']))
+            elif not update_recipe_columns(cursor, recipe_id, changes):
+                return False
+        search_cache.bump_generation()
+        return True
+    
+    def delete(self, recipe_id):
+        """
+        Delete a recipe and release its catalog counts
+        
+        Returns:
+            bool: True if the recipe was deleted, False if no recipe has this id
+        """
+        with self.transaction() as cursor:
+            cursor.execute("SELECT ingredients FROM Recipes WHERE id = %s FOR UPDATE", (recipe_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return False
+            cursor.execute("DELETE FROM Recipes WHERE id = %s", (recipe_id,))
+            remove_from_catalog(cursor, parse_ingredients(row[0]))
+        search_cache.bump_generation()
+        return True
+
+# Initialize the service used by the menu
+service = RecipeService(pool)
+
+# Menu Functions
+# Prompt for input, call the service and print the results
+
+def print_recipe(recipe):
+    """Print the fields of one RecipeRecord"""
+    print(f"ID: {recipe.id}")
+    print(f"Name: {recipe.name}")
+    print(f"Ingredients: {recipe.ingredients}")
+    print(f"Cooking Time: {recipe.cooking_time} minutes")
+    print(f"Difficulty: {recipe.difficulty}")
+    print("-"*40)
+
+def create_recipe():
     """Function to create a new recipe"""
     print("\n--- Creating a New Recipe ---")
     
@@ -78,57 +534,31 @@ def create_recipe(conn, cursor):
         if ingredient:  # Only add non-empty ingredients
             ingredients.append(ingredient)
     
-    # Calculate difficulty
-    difficulty = calculate_difficulty(cooking_time, ingredients)
-    
-    # Convert ingredients list to comma-separated string
-    ingredients_str = ", ".join(ingredients)
-    
-    # Build and execute SQL query
-    query = "INSERT INTO Recipes (name, ingredients, cooking_time, difficulty) VALUES (%s, %s, %s, %s)"
-    values = (name, ingredients_str, cooking_time, difficulty)
-    
     try:
-        cursor.execute(query, values)
-        conn.commit()
-        print(f"\nRecipe '{name}' with difficulty '{difficulty}' has been successfully added to the database!")
-    except mysql.connector.Error as err:
+        recipe = service.create(name, cooking_time, ingredients)
+        print(f"\nRecipe '{recipe.name}' with difficulty '{recipe.difficulty}' has been successfully added to the database!")
+    except (ValueError, mysql.connector.Error) as err:
         print(f"Error adding recipe: {err}")
-        conn.rollback()
 
-def search_recipe(conn, cursor):
+def search_recipe():
     """Function to search for recipes by ingredient"""
     print("\n--- Search for Recipes by Ingredient ---")
     
-    # Get all ingredients from the database
     try:
-        cursor.execute("SELECT ingredients FROM Recipes")
-        results = cursor.fetchall()
+        # Get all ingredients from the catalog, already distinct and sorted
+        results = service.ingredients()
         
         if not results:
             print("No recipes found in the database. Please add some recipes first.")
             return
         
-        # Extract all unique ingredients
-        all_ingredients = []
-        for row in results:
-            ingredients_str = row[0]  # Get the ingredients string from the tuple
-            # Split the ingredients string by comma and strip whitespace
-            ingredients_list = [ingredient.strip() for ingredient in ingredients_str.split(',')]
-            
-            # Add each ingredient to all_ingredients if not already present
-            for ingredient in ingredients_list:
-                if ingredient and ingredient not in all_ingredients:
-                    all_ingredients.append(ingredient)
-        
-        # Sort ingredients alphabetically for better display
-        all_ingredients.sort()
+        all_ingredients = [name for name, _ in results]
         
         # Display all ingredients to the user
         print("\nAvailable ingredients:")
         print("-" * 30)
-        for i, ingredient in enumerate(all_ingredients, 1):
-            print(f"{i}. {ingredient}")
+        for i, (ingredient, recipe_count) in enumerate(results, 1):
+            print(f"{i}. {ingredient} ({recipe_count} recipes)")
         print("-" * 30)
         
         # Get user's choice
@@ -144,72 +574,58 @@ def search_recipe(conn, cursor):
                 print("Please enter a valid number.")
         
         # Search for recipes containing the selected ingredient
-        search_query = "SELECT id, name, ingredients, cooking_time, difficulty FROM Recipes WHERE ingredients LIKE %s"
-        search_pattern = f"%{search_ingredient}%"
-        
-        cursor.execute(search_query, (search_pattern,))
-        recipe_results = cursor.fetchall()
+        recipe_results = service.search(search_ingredient)
         
         # Display the results
         if recipe_results:
             print(f"\nRecipes containing '{search_ingredient}':")
             print("="*60)
             for recipe in recipe_results:
-                recipe_id, name, ingredients, cooking_time, difficulty = recipe
-                print(f"ID: {recipe_id}")
-                print(f"Name: {name}")
-                print(f"Ingredients: {ingredients}")
-                print(f"Cooking Time: {cooking_time} minutes")
-                print(f"Difficulty: {difficulty}")
-                print("-"*40)
+                print_recipe(recipe)
         else:
             print(f"\nNo recipes found containing '{search_ingredient}'.")
     
     except mysql.connector.Error as err:
         print(f"Error searching for recipes: {err}")
 
-def update_recipe(conn, cursor):
+def choose_recipe(action):
+    """
+    List every recipe and ask for the id of one of them
+    
+    Returns:
+        RecipeRecord: The chosen recipe, or None if there are no recipes
+    """
+    recipes = {recipe.id: recipe for recipe in service.list()}
+    
+    if not recipes:
+        print(f"No recipes found in the database. Nothing to {action}.")
+        return None
+    
+    # Display all recipes to the user
+    print("\nAvailable recipes:")
+    print("="*80)
+    for recipe in recipes.values():
+        print_recipe(recipe)
+    
+    # Get user's choice of recipe
+    while True:
+        try:
+            recipe_id = int(input(f"Enter the ID of the recipe you want to {action}: "))
+            if recipe_id in recipes:
+                return recipes[recipe_id]
+            print("Recipe ID not found. Please enter a valid ID.")
+        except ValueError:
+            print("Please enter a valid number.")
+
+def update_recipe():
     """Function to update an existing recipe"""
     print("\n--- Update an Existing Recipe ---")
     
     try:
-        # Fetch all recipes from the database
-        cursor.execute("SELECT id, name, ingredients, cooking_time, difficulty FROM Recipes")
-        recipes = cursor.fetchall()
-        
-        if not recipes:
-            print("No recipes found in the database. Please add some recipes first.")
+        recipe = choose_recipe("update")
+        if recipe is None:
             return
         
-        # Display all recipes to the user
-        print("\nAvailable recipes:")
-        print("="*80)
-        for recipe in recipes:
-            recipe_id, name, ingredients, cooking_time, difficulty = recipe
-            print(f"ID: {recipe_id}")
-            print(f"Name: {name}")
-            print(f"Ingredients: {ingredients}")
-            print(f"Cooking Time: {cooking_time} minutes")
-            print(f"Difficulty: {difficulty}")
-            print("-"*40)
-        
-        # Get user's choice for which recipe to update
-        while True:
-            try:
-                recipe_id = int(input("Enter the ID of the recipe you want to update: "))
-                # Check if the recipe ID exists
-                recipe_exists = any(recipe[0] == recipe_id for recipe in recipes)
-                if recipe_exists:
-                    break
-                else:
-                    print("Recipe ID not found. Please enter a valid ID.")
-            except ValueError:
-                print("Please enter a valid number.")
-        
-        # Get the current recipe data
-        selected_recipe = next(recipe for recipe in recipes if recipe[0] == recipe_id)
-        current_name, current_ingredients, current_cooking_time, current_difficulty = selected_recipe[1:]
-        
         # Display update options
         print("\nWhich column would you like to update?")
         print("1. Name")
@@ -230,13 +646,10 @@ def update_recipe(conn, cursor):
         if column_choice == 1:
             # Update name
             new_value = input("Enter the new recipe name: ").strip()
-            if new_value:
-                update_query = "UPDATE Recipes SET name = %s WHERE id = %s"
-                cursor.execute(update_query, (new_value, recipe_id))
-                print(f"Recipe name updated to '{new_value}'")
-            else:
+            if not new_value:
                 print("Name cannot be empty. No changes made.")
                 return
+            changes = {'name': new_value}
                 
         elif column_choice == 2:
             # Update cooking time
@@ -246,21 +659,7 @@ def update_recipe(conn, cursor):
                     break
                 except ValueError:
                     print("Please enter a valid number for cooking time.")
-            
-            # Update cooking time
-            update_query = "UPDATE Recipes SET cooking_time = %s WHERE id = %s"
-            cursor.execute(update_query, (new_cooking_time, recipe_id))
-            
-            # Recalculate difficulty since cooking time changed
-            ingredients_list = [ingredient.strip() for ingredient in current_ingredients.split(',')]
-            new_difficulty = calculate_difficulty(new_cooking_time, ingredients_list)
-            
-            # Update difficulty
-            difficulty_query = "UPDATE Recipes SET difficulty = %s WHERE id = %s"
-            cursor.execute(difficulty_query, (new_difficulty, recipe_id))
-            
-            print(f"Cooking time updated to {new_cooking_time} minutes")
-            print(f"Difficulty recalculated to '{new_difficulty}'")
+            changes = {'cooking_time': new_cooking_time}
             
         elif column_choice == 3:
             # Update ingredients
@@ -273,97 +672,309 @@ def update_recipe(conn, cursor):
                 if ingredient:
                     new_ingredients.append(ingredient)
             
-            if new_ingredients:
-                # Convert ingredients list to comma-separated string
-                new_ingredients_str = ", ".join(new_ingredients)
-                
-                # Update ingredients
-                update_query = "UPDATE Recipes SET ingredients = %s WHERE id = %s"
-                cursor.execute(update_query, (new_ingredients_str, recipe_id))
-                
-                # Recalculate difficulty since ingredients changed
-                new_difficulty = calculate_difficulty(current_cooking_time, new_ingredients)
-                
-                # Update difficulty
-                difficulty_query = "UPDATE Recipes SET difficulty = %s WHERE id = %s"
-                cursor.execute(difficulty_query, (new_difficulty, recipe_id))
-                
-                print(f"Ingredients updated to: {new_ingredients_str}")
-                print(f"Difficulty recalculated to '{new_difficulty}'")
-            else:
+            if not new_ingredients:
                 print("No ingredients entered. No changes made.")
                 return
+            changes = {'ingredients': new_ingredients}
+        
+        # Update the column and recalculate difficulty in one statement
+        if not service.update(recipe.id, **changes):
+            print("Recipe ID not found.")
+            return
+        
+        if column_choice == 1:
+            print(f"Recipe name updated to '{changes['name']}'")
+        else:
+            # Read back the difficulty the update computed
+            updated = service.get(recipe.id)
+            if column_choice == 2:
+                print(f"Cooking time updated to {updated.cooking_time} minutes")
+            else:
+                print(f"Ingredients updated to: {updated.ingredients}")
+            print(f"Difficulty recalculated to '{updated.difficulty}'")
         
-        # Commit all changes
-        conn.commit()
         print("\nRecipe updated successfully!")
         
-    except mysql.connector.Error as err:
+    except (ValueError, mysql.connector.Error) as err:
         print(f"Error updating recipe: {err}")
-        conn.rollback()
 
-def delete_recipe(conn, cursor):
+def delete_recipe():
     """Function to delete a recipe"""
     print("\n--- Delete a Recipe ---")
     
     try:
-        # Fetch all recipes from the database
-        cursor.execute("SELECT id, name, ingredients, cooking_time, difficulty FROM Recipes")
-        recipes = cursor.fetchall()
-        
-        if not recipes:
-            print("No recipes found in the database. Nothing to delete.")
+        recipe = choose_recipe("delete")
+        if recipe is None:
             return
         
-        # Display all recipes to the user
-        print("\nAvailable recipes:")
-        print("="*80)
-        for recipe in recipes:
-            recipe_id, name, ingredients, cooking_time, difficulty = recipe
-            print(f"ID: {recipe_id}")
-            print(f"Name: {name}")
-            print(f"Ingredients: {ingredients}")
-            print(f"Cooking Time: {cooking_time} minutes")
-            print(f"Difficulty: {difficulty}")
-            print("-"*40)
-        
-        # Get user's choice for which recipe to delete
-        while True:
-            try:
-                recipe_id = int(input("Enter the ID of the recipe you want to delete: "))
-                # Check if the recipe ID exists
-                recipe_exists = any(recipe[0] == recipe_id for recipe in recipes)
-                if recipe_exists:
-                    break
-                else:
-                    print("Recipe ID not found. Please enter a valid ID.")
-            except ValueError:
-                print("Please enter a valid number.")
-        
-        # Get the recipe name for confirmation
-        selected_recipe = next(recipe for recipe in recipes if recipe[0] == recipe_id)
-        recipe_name = selected_recipe[1]
-        
         # Confirm deletion
-        confirm = input(f"Are you sure you want to delete '{recipe_name}'? (y/n): ").lower().strip()
+        confirm = input(f"Are you sure you want to delete '{recipe.name}'? (y/n): ").lower().strip()
         
         if confirm == 'y' or confirm == 'yes':
-            # Build and execute DELETE query
-            delete_query = "DELETE FROM Recipes WHERE id = %s"
-            cursor.execute(delete_query, (recipe_id,))
-            
-            # Commit the changes
-            conn.commit()
-            
-            print(f"\nRecipe '{recipe_name}' has been successfully deleted from the database!")
+            if service.delete(recipe.id):
+                print(f"\nRecipe '{recipe.name}' has been successfully deleted from the database!")
+            else:
+                print("Recipe ID not found.")
         else:
             print("Deletion cancelled.")
             
     except mysql.connector.Error as err:
         print(f"Error deleting recipe: {err}")
-        conn.rollback()
 
-def main_menu(conn, cursor):
+def batched(iterable, batch_size):
+    """Generator yielding lists of up to batch_size items from an iterable"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def check_batch_ingredients(ingredients):
+    """Return the normalized ingredients of a list of strings, raising ValueError for anything else"""
+    if isinstance(ingredients, str) or not all(isinstance(ingredient, str) for ingredient in ingredients):
+        raise ValueError("Ingredients must be a list of strings.")
+    return normalize_ingredients(ingredients)
+
+def check_batch_recipe(recipe):
+    """
+    Validate one recipe of create_recipes_batch() with the checks of RecipeService.create()
+    
+    Returns:
+        tuple: (name, cooking_time, normalized ingredients)
+    
+    Raises:
+        ValueError: If a key is missing or a value is invalid
+    """
+    try:
+        name, cooking_time, ingredients = recipe['name'], recipe['cooking_time'], recipe['ingredients']
+        RecipeService.check_name(name)
+        RecipeService.check_cooking_time(cooking_time)
+        return name, cooking_time, check_batch_ingredients(ingredients)
+    except (KeyError, TypeError) as err:
+        raise ValueError(f"Malformed recipe {recipe!r} ({type(err).__name__}: {err})") from None
+
+def check_batch_update(update):
+    """
+    Validate one update of update_recipes_batch() with the checks of RecipeService.update()
+    
+    Returns:
+        tuple: (recipe_id, field, value), with ingredients as the string to store
+    
+    Raises:
+        ValueError: If the update is malformed or its value is invalid
+    """
+    try:
+        recipe_id, field, value = update
+        if not isinstance(recipe_id, int) or isinstance(recipe_id, bool):
+            raise ValueError(f"Recipe ID {recipe_id!r} is not a whole number.")
+        if field == 'name':
+            RecipeService.check_name(value)
+        elif field == 'cooking_time':
+            RecipeService.check_cooking_time(value)
+        elif field == 'ingredients':
+            value = ", ".join(check_batch_ingredients(value))
+        else:
+            raise ValueError(f"Unknown field '{field}'.")
+    except TypeError as err:
+        raise ValueError(f"Malformed update {update!r} ({err})") from None
+    return recipe_id, field, value
+
+@with_pooled_connection
+def create_recipes_batch(conn, cursor, recipes, batch_size=500):
+    """
+    Insert many recipes without prompting, one executemany and one commit per batch
+    Called without conn and cursor, which come from the connection pool
+    
+    mysql.connector turns the executemany INSERT into multi-row VALUES
+    statements. Every recipe is validated first like RecipeService.create()
+    does; invalid ones are reported and skipped. A batch that fails is
+    rolled back on its own and the remaining batches are still written.
+    
+    Args:
+        recipes (iterable): Recipe dictionaries with 'name', 'cooking_time'
+            and 'ingredients' (a list of strings) keys
+        batch_size (int): Number of recipes written per transaction
+    
+    Returns:
+        int: Number of recipes inserted
+    """
+    query = "INSERT INTO Recipes (name, ingredients, cooking_time, difficulty) VALUES (%s, %s, %s, %s)"
+    inserted = 0
+    
+    for batch in batched(recipes, batch_size):
+        values = []
+        catalog_counts = {}
+        for recipe in batch:
+            try:
+                name, cooking_time, ingredients = check_batch_recipe(recipe)
+            except ValueError as err:
+                print(f"Skipping invalid recipe: {err}")
+                continue
+            difficulty = calculate_difficulty(cooking_time, ingredients)
+            values.append((name, ", ".join(ingredients), cooking_time, difficulty))
+            
+            for ingredient in ingredients:
+                catalog_counts[ingredient] = catalog_counts.get(ingredient, 0) + 1
+        
+        if not values:
+            continue
+        
+        try:
+            cursor.executemany(query, values)
+            adjust_catalog(cursor, catalog_counts)
+            conn.commit()
+            search_cache.bump_generation()
+            inserted += len(values)
+        except mysql.connector.Error as err:
+            print(f"Error adding batch of {len(values)} recipes: {err}")
+            conn.rollback()
+    
+    return inserted
+
+@with_pooled_connection
+def update_recipes_batch(conn, cursor, updates, batch_size=500):
+    """
+    Apply many (id, field, value) updates without prompting, one commit per batch
+    Called without conn and cursor, which come from the connection pool
+    
+    Each batch reads the affected rows once, applies the changes in Python,
+    recalculates difficulty and writes every changed row back with a single
+    multi-row INSERT ... ON DUPLICATE KEY UPDATE. Every update is validated
+    first like RecipeService.update() does; invalid ones and updates of
+    unknown ids are reported and skipped. A batch that fails is rolled
+    back on its own.
+    
+    Args:
+        updates (iterable): (recipe_id, field, value) tuples where field is
+            'name', 'cooking_time' or 'ingredients' (a list of strings)
+        batch_size (int): Number of updates applied per transaction
+    
+    Returns:
+        int: Number of recipes updated
+    """
+    write_query = """
+    INSERT INTO Recipes (id, name, ingredients, cooking_time, difficulty) VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE name = VALUES(name), ingredients = VALUES(ingredients),
+        cooking_time = VALUES(cooking_time), difficulty = VALUES(difficulty)
+    """
+    updated = 0
+    
+    for batch in batched(updates, batch_size):
+        valid = []
+        for update in batch:
+            try:
+                valid.append(check_batch_update(update))
+            except ValueError as err:
+                print(f"Skipping invalid update: {err}")
+        if not valid:
+            continue
+        batch = valid
+        
+        try:
+            # Read and lock the current state of every recipe in the batch
+            recipe_ids = list({recipe_id for recipe_id, _, _ in batch})
+            placeholders = ", ".join(["%s"] * len(recipe_ids))
+            cursor.execute(
+                f"SELECT id, name, ingredients, cooking_time FROM Recipes WHERE id IN ({placeholders}) FOR UPDATE",
+                recipe_ids
+            )
+            current = {row[0]: list(row[1:]) for row in cursor.fetchall()}
+            original_ingredients = {recipe_id: row[1] for recipe_id, row in current.items()}
+            
+            # Apply the updates in order, so later ones win for the same recipe
+            changed = set()
+            for recipe_id, field, value in batch:
+                if recipe_id not in current:
+                    print(f"Recipe ID {recipe_id} not found. Update skipped.")
+                    continue
+                current[recipe_id][UPDATABLE_COLUMNS.index(field)] = value
+                changed.add(recipe_id)
+            
+            if not changed:
+                conn.rollback()
+                continue
+            
+            # Build the new rows and the catalog changes for replaced ingredients
+            values = []
+            catalog_counts = {}
+            for recipe_id in changed:
+                name, ingredients_str, cooking_time = current[recipe_id]
+                difficulty = calculate_difficulty(cooking_time, parse_ingredients(ingredients_str))
+                values.append((recipe_id, name, ingredients_str, cooking_time, difficulty))
+                
+                if ingredients_str != original_ingredients[recipe_id]:
+                    for ingredient in parse_ingredients(original_ingredients[recipe_id]):
+                        catalog_counts[ingredient] = catalog_counts.get(ingredient, 0) - 1
+                    for ingredient in parse_ingredients(ingredients_str):
+                        catalog_counts[ingredient] = catalog_counts.get(ingredient, 0) + 1
+            
+            cursor.executemany(write_query, values)
+            adjust_catalog(cursor, catalog_counts)
+            conn.commit()
+            search_cache.bump_generation()
+            updated += len(values)
+        except mysql.connector.Error as err:
+            print(f"Error applying batch of {len(batch)} updates: {err}")
+            conn.rollback()
+    
+    return updated
+
+@with_pooled_connection
+def recalculate_all_difficulties(conn, cursor, chunk_size=5000):
+    """
+    Recalculate the difficulty of every stored recipe, e.g. after changing thresholds
+    Called without conn and cursor, which come from the connection pool
+    
+    Reads (id, ingredients, cooking_time, difficulty) rows in keyset-ordered
+    chunks, computes the new difficulty codes of a whole chunk at once and
+    writes back only the rows that changed, with one executemany and one
+    commit per chunk. Ingredients are counted with parse_ingredients(), and
+    strings not stored in that form (e.g. "Salt,Pepper" from before it was
+    enforced) are rewritten in it, so INGREDIENT_COUNT_SQL counts them the
+    same way afterwards.
+    
+    Returns:
+        int: Number of recipes whose difficulty or ingredients string changed
+    """
+    changed_total = 0
+    last_id = 0
+    
+    while True:
+        cursor.execute(
+            "SELECT id, ingredients, cooking_time, difficulty FROM Recipes WHERE id > %s ORDER BY id LIMIT %s",
+            (last_id, chunk_size)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        
+        # Count ingredients the same way as every write path
+        ingredient_lists = [parse_ingredients(ingredients) for _, ingredients, _, _ in rows]
+        cooking_times = [cooking_time or 0 for _, _, cooking_time, _ in rows]
+        codes = difficulty_codes(cooking_times, [len(ingredients) for ingredients in ingredient_lists])
+        
+        changes = []
+        for (recipe_id, ingredients_str, _, difficulty), ingredients, code in zip(rows, ingredient_lists, codes):
+            new_difficulty = DIFFICULTY_LEVELS[code]
+            new_ingredients_str = ", ".join(ingredients)
+            if new_difficulty != difficulty or new_ingredients_str != (ingredients_str or ""):
+                changes.append((new_ingredients_str, new_difficulty, recipe_id))
+        
+        if changes:
+            cursor.executemany("UPDATE Recipes SET ingredients = %s, difficulty = %s WHERE id = %s", changes)
+        conn.commit()
+        changed_total += len(changes)
+        
+        # Cached search results may hold the old difficulty
+        if changes:
+            search_cache.bump_generation()
+        print(f"Checked recipes up to id {last_id}, {changed_total} recipes changed so far.")
+    
+    return changed_total
+
+def main_menu():
     """Main menu function with user options"""
     
     while True:
@@ -381,24 +992,36 @@ def main_menu(conn, cursor):
         choice = input("Enter your choice (1-5): ").strip()
         
         if choice == '1':
-            create_recipe(conn, cursor)
+            create_recipe()
         elif choice == '2':
-            search_recipe(conn, cursor)
+            search_recipe()
         elif choice == '3':
-            update_recipe(conn, cursor)
+            update_recipe()
         elif choice == '4':
-            delete_recipe(conn, cursor)
+            delete_recipe()
         elif choice == '5':
             print("\nExiting the program...")
             break
         else:
             print("\nInvalid choice. Please enter a number between 1-5.")
     
-    # Commit any changes and close connections
-    conn.commit()
-    cursor.close()
-    conn.close()
+    # Report how well the search cache worked
+    stats = search_cache.stats()
+    print(f"Search cache: {stats['hits']} hits, {stats['misses']} misses")
+    search_cache.close()
+    
+    # Close all pooled connections
+    pool.dispose()
     print("Connection closed. Goodbye!")
 
-# Call the main menu
-main_menu(conn, cursor)
\ No newline at end of file
+# Set up the database and call the main menu
+# 'python recipe_mysql.py init' only creates/migrates the tables
+# 'python recipe_mysql.py recalculate' recalculates every stored difficulty
+if __name__ == "__main__":
+    init_database()
+    if sys.argv[1:] == ['recalculate']:
+        changed = recalculate_all_difficulties()
+        print(f"Difficulty recalculation finished: {changed} recipes changed.")
+        pool.dispose()
+    elif sys.argv[1:] != ['init']:
+        main_menu()
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+EXPLAIN-based check that the common recipe queries use the final_recipes indexes
+
+Asks the database for the query plan of each query (EXPLAIN on MySQL,
+EXPLAIN QUERY PLAN on SQLite) and reports the indexes it would use to
+look rows up. On SQLite a SCAN through an index reads all of it, so only
+SEARCH steps count. Exits with status 1 when a query doesn't use the
+index it should.
+
+Usage:
+    python check_indexes.py
+
+Run it against a populated database: on nearly empty tables the
+optimizer may rightly prefer a full table scan.
+"""
+
+import re
+import sys
+
+from sqlalchemy import select, text
+
+from recipe_app import init_db, session, get_engine, Recipe, name_search_condition
+
+
+def common_queries():
+    """Return (description, select statement, expected index name) for the common queries"""
+    is_mysql = get_engine().dialect.name == 'mysql'
+    queries = [
+        ("Recipe by name",
+         select(Recipe).where(Recipe.name == 'Tea'),
+         'ix_final_recipes_name'),
+        ("Recipes by difficulty",
+         select(Recipe).where(Recipe.difficulty == 'Hard'),
+         'ix_final_recipes_difficulty_cooking_time'),
+        ("Recipes by difficulty and maximum cooking time",
+         select(Recipe).where(Recipe.difficulty == 'Easy', Recipe.cooking_time <= 5),
+         'ix_final_recipes_difficulty_cooking_time'),
+        ("Recipes by cooking time range",
+         select(Recipe).where(Recipe.cooking_time.between(100, 110)),
+         'ix_final_recipes_cooking_time'),
+        # The query of find_recipes_by_name(): words in the name on MySQL, a name prefix elsewhere
+        ("Recipes by name search",
+         select(Recipe).where(name_search_condition('Tea')).order_by(Recipe.name),
+         'ix_final_recipes_name_fulltext' if is_mysql else 'ix_final_recipes_name'),
+    ]
+    return queries
+
+
+def explain(statement):
+    """
+    Return the set of index names the database plans to use for a statement
+
+    Raises:
+        NotImplementedError: For databases other than MySQL and SQLite
+    """
+    dialect = get_engine().dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+    if dialect.name == 'sqlite':
+        details = [row[-1] for row in session.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+        return {name for detail in details for name in re.findall(r'^SEARCH .*?USING (?:COVERING )?INDEX (\w+)', detail)}
+    if dialect.name == 'mysql':
+        keys = [row['key'] for row in session.execute(text('EXPLAIN ' + sql)).mappings()]
+        return {name for key in keys if key for name in key.split(',')}
+    raise NotImplementedError(f"EXPLAIN check not available for {dialect.name}")
+
+
+def check_indexes():
+    """
+    Print the plan of every common query
+
+    Returns:
+        bool: True if every query uses its expected index
+    """
+    all_used = True
+    for description, statement, expected_index in common_queries():
+        used = explain(statement)
+        status = "OK" if expected_index in used else "MISSING"
+        all_used = all_used and expected_index in used
+        print(f"{status:8}{description}: uses {', '.join(sorted(used)) or 'no index'} (expects {expected_index})")
+    return all_used
+
+
+if __name__ == "__main__":
+    init_db()
+    if not check_indexes():
+        sys.exit(1)
@@ -1,6 +1,23 @@
-from sqlalchemy import create_engine, Column, Integer, String
+import os
+import sys
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+from sqlalchemy import (
+    create_engine, Column, Integer, String, ForeignKey, Index, func, bindparam,
+    case, literal, select, update, delete
+)
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session, Session as OrmSession
+
+# Modules shared by the exercises (the difficulty rule and the caches) live in the shared folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'shared'))
+from difficulty import (  # noqa: E402  (shared/difficulty.py)
+    DIFFICULTY_LEVELS, SLOW_COOKING_TIME, MANY_INGREDIENTS, difficulty_code, difficulty_codes
+)
+from recipe_cache import LRUCache, SearchResultCache  # noqa: E402  (shared/recipe_cache.py)
 
 # Set up SQLAlchemy
 # Database connection details
@@ -9,17 +26,113 @@ password = 'admin'
 hostname = 'localhost'
 database_name = 'task_database'
 
-# Create engine object that connects to the database
-engine = create_engine(f'mysql+pymysql://{username}:{password}@{hostname}/{database_name}')
+# Database URL, can be overridden (e.g. with a local SQLite file) through the environment
+database_url = os.environ.get(
+    'RECIPE_DATABASE_URL',
+    f'mysql+pymysql://{username}:{password}@{hostname}/{database_name}'
+)
+
+# Connection pool settings, can be tuned through the environment
+POOL_SIZE = int(os.environ.get('RECIPE_POOL_SIZE', 10))               # connections kept open
+POOL_MAX_OVERFLOW = int(os.environ.get('RECIPE_POOL_MAX_OVERFLOW', 20))  # extra connections under load
+POOL_TIMEOUT = 30     # seconds to wait for a free connection before failing
+POOL_RECYCLE = 1800   # seconds before a connection is replaced (MySQL drops idle ones after wait_timeout)
+
+# Engine object, created on first database access by get_engine()
+engine = None
+engine_lock = threading.Lock()
+
+def engine_options(url):
+    """
+    Return the create_engine() pool arguments for a database URL
+    In-memory SQLite keeps one connection per thread, so it gets no pool sizing
+    """
+    url = make_url(url)
+    is_sqlite = url.get_backend_name() == 'sqlite'
+    if is_sqlite and url.database in (None, '', ':memory:'):
+        return {}
+    options = {
+        'pool_size': POOL_SIZE,
+        'max_overflow': POOL_MAX_OVERFLOW,
+        'pool_timeout': POOL_TIMEOUT,
+        'pool_recycle': POOL_RECYCLE,
+        'pool_pre_ping': True  # test connections on checkout instead of failing on a dropped one
+    }
+    if is_sqlite:
+        # SQLite lets one writer in at a time; wait for the file lock as long
+        # as for a pool connection instead of the driver's 5 second default
+        options['connect_args'] = {'timeout': POOL_TIMEOUT}
+    return options
+
+def get_engine():
+    """
+    Return the engine that connects to the database, creating it on first use
+    Importing this module therefore never loads the database driver or connects
+    """
+    global engine
+    if engine is None:
+        # Threads starting at the same time must not each create an engine
+        with engine_lock:
+            if engine is None:
+                engine = create_engine(database_url, **engine_options(database_url))
+    return engine
 
 # Create declarative base for model definitions
 Base = declarative_base()
 
-# Generate Session class and bind it to the engine
-Session = sessionmaker(bind=engine)
+class RecipeSession(OrmSession):
+    """Session that looks up the engine only when it first talks to the database"""
+    
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        """Return the lazily created engine for every query"""
+        return get_engine()
 
-# Initialize session object
-session = Session()
+# Generate Session class using the lazy engine lookup
+Session = sessionmaker(class_=RecipeSession)
+
+# Module session: a registry handing every thread its own session, so the
+# module functions can be called from several threads at once
+# (no connection is made until a thread first uses it)
+session = scoped_session(Session)
+
+@contextmanager
+def session_scope():
+    """
+    Provide a new session for one unit of work (e.g. one request or job)
+    Commits when the block succeeds, rolls back when it raises and always closes
+    """
+    db_session = Session()
+    try:
+        yield db_session
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+        raise
+    finally:
+        db_session.close()
+
+def difficulty_level(cooking_time, num_ingredients):
+    """
+    Return the difficulty for a cooking time and number of ingredients
+    Shared by Recipe.calculate_difficulty and the bulk importer
+    (the rule and its thresholds live in difficulty.py)
+    """
+    return DIFFICULTY_LEVELS[difficulty_code(cooking_time, num_ingredients)]
+
+def difficulty_expression(cooking_time, num_ingredients):
+    """
+    Return a SQL CASE expression applying the same rule as difficulty_level()
+    Both arguments are SQL expressions (columns, subqueries or literal() values),
+    so an UPDATE can compute the difficulty on the database server
+    """
+    slow = cooking_time >= SLOW_COOKING_TIME
+    many = num_ingredients >= MANY_INGREDIENTS
+    return case(
+        (slow & many, DIFFICULTY_LEVELS[3]),
+        (slow, DIFFICULTY_LEVELS[2]),
+        (many, DIFFICULTY_LEVELS[1]),
+        else_=DIFFICULTY_LEVELS[0]
+    )
 
 # Define Recipe model
 class Recipe(Base):
@@ -35,6 +148,15 @@ class Recipe(Base):
     cooking_time = Column(Integer)
     difficulty = Column(String(20))
     
+    # Secondary indexes for lookups by name, cooking time and difficulty
+    # The composite index also serves queries on difficulty alone
+    # On MySQL names also get a FULLTEXT index for word searches (see create_fulltext_index())
+    __table_args__ = (
+        Index('ix_final_recipes_name', 'name'),
+        Index('ix_final_recipes_cooking_time', 'cooking_time'),
+        Index('ix_final_recipes_difficulty_cooking_time', 'difficulty', 'cooking_time'),
+    )
+    
     def __repr__(self):
         """Quick representation of the recipe"""
         return f"<Recipe(id={self.id}, name='{self.name}', difficulty='{self.difficulty}')>"
@@ -59,30 +181,761 @@ class Recipe(Base):
         ingredients_list = self.return_ingredients_as_list()
         num_ingredients = len(ingredients_list)
         
-        if self.cooking_time < 10 and num_ingredients < 4:
-            self.difficulty = "Easy"
-        elif self.cooking_time < 10 and num_ingredients >= 4:
-            self.difficulty = "Medium"
-        elif self.cooking_time >= 10 and num_ingredients < 4:
-            self.difficulty = "Intermediate"
-        else:  # cooking_time >= 10 and num_ingredients >= 4
-            self.difficulty = "Hard"
+        self.difficulty = difficulty_level(self.cooking_time, num_ingredients)
     
     def return_ingredients_as_list(self):
         """
-        Return ingredients as a list, splitting by comma and space
+        Return ingredients as a list, split and counted like every write path (see normalize_ingredients())
         """
-        if not self.ingredients or self.ingredients == "":
-            return []
+        return normalize_ingredients([self.ingredients or ""])
+
+# Define ingredient index model
+class RecipeIngredient(Base):
+    """
+    Ingredient index entry linking one ingredient to one recipe
+
+    The comma-separated Recipe.ingredients string stays the display value,
+    while this table holds one row per (ingredient, recipe) pair so that
+    ingredient searches become exact-match indexed lookups instead of
+    LIKE scans over final_recipes. Ingredients are stored as their
+    ingredient_key(), so lookups ignore case on every database.
+    """
+
+    # Set table name
+    __tablename__ = 'recipe_ingredients'
+
+    # Ingredient comes first in the primary key so lookups by ingredient use it
+    ingredient = Column(String(255), primary_key=True)
+    recipe_id = Column(Integer, ForeignKey('final_recipes.id', ondelete='CASCADE'), primary_key=True)
+
+    # Secondary index for finding all ingredients of one recipe (sync/delete)
+    __table_args__ = (Index('ix_recipe_ingredients_recipe_id', 'recipe_id'),)
+
+    def __repr__(self):
+        """Quick representation of the index entry"""
+        return f"<RecipeIngredient(ingredient='{self.ingredient}', recipe_id={self.recipe_id})>"
+
+# Define ingredient catalog model
+class IngredientCatalog(Base):
+    """
+    Catalog entry for one distinct ingredient and the number of recipes using it
+
+    Updated incrementally whenever the ingredient index changes, so listing
+    the available ingredients is a single small read regardless of how many
+    recipes are stored. Keyed by the same ingredient_key() as the index.
+    """
+
+    # Set table name
+    __tablename__ = 'ingredient_catalog'
+
+    # Define table columns
+    ingredient = Column(String(255), primary_key=True)
+    recipe_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        """Quick representation of the catalog entry"""
+        return f"<IngredientCatalog(ingredient='{self.ingredient}', recipe_count={self.recipe_count})>"
+
+# Ingredient Index Functions
+# These use the module session unless another session is passed as db_session
+
+def normalize_ingredients(ingredients):
+    """
+    Return the distinct, stripped ingredient names from a list, keeping order
+
+    Entries are split on commas first, as ingredients are stored as one
+    comma-separated string: "Salt, Pepper" is two ingredients whether it is
+    stored, indexed or counted for the difficulty. Every write path uses
+    the returned list for all three.
+
+    Names differing only in case count as one ingredient (the first spelling
+    is kept), as they share one ingredient_key().
+    """
+    normalized = []
+    seen = set()
+    for entry in ingredients:
+        for ingredient in entry.split(","):
+            ingredient = ingredient.strip()
+            if ingredient and ingredient_key(ingredient) not in seen:
+                seen.add(ingredient_key(ingredient))
+                normalized.append(ingredient)
+    return normalized
+
+def ingredient_key(ingredient):
+    """
+    Return the key an ingredient is stored under in the index and catalog
+
+    Keys are casefolded, so "Salt" and "salt" are one ingredient whether
+    the key columns compare case-sensitively (SQLite, PostgreSQL) or not
+    (MySQL's default collation).
+    """
+    return ingredient.casefold()
+
+def ingredient_keys(ingredients):
+    """Return the distinct ingredient keys of a list of ingredient entries (see normalize_ingredients())"""
+    return [ingredient_key(ingredient) for ingredient in normalize_ingredients(ingredients)]
+
+def count_ingredients(key_lists, counts=None):
+    """
+    Count the recipes using each ingredient
+
+    Args:
+        key_lists (iterable): Ingredient keys of each recipe (see ingredient_keys())
+        counts (dict): Counts to add to (from an earlier call), or None to start from zero
+
+    Returns:
+        dict: Ingredient key -> number of recipes
+    """
+    if counts is None:
+        counts = {}
+    for keys in key_lists:
+        for key in keys:
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+def add_ingredient_counts(counts, db_session=None):
+    """
+    Add recipe counts to the catalog, creating entries for new ingredients
+
+    Uses a single upsert (INSERT ... ON DUPLICATE KEY UPDATE on MySQL,
+    ON CONFLICT DO UPDATE on SQLite and PostgreSQL), so concurrent sessions
+    neither overwrite each other's changes nor race to insert the same new
+    ingredient; other databases update the existing entries and insert the
+    rest. Ingredients are written in sorted order, so two sessions always
+    lock catalog rows in the same order. The caller is responsible for
+    committing the session.
+
+    Args:
+        counts (dict): Ingredient key -> positive number of recipes to add
+    """
+    if db_session is None:
+        db_session = session
+    if not counts:
+        return
+
+    rows = [{'ingredient': ingredient, 'recipe_count': count} for ingredient, count in sorted(counts.items())]
+    table = IngredientCatalog.__table__
+    # The dialect's insert() is imported here, so importing this module stays cheap
+    dialect = db_session.get_bind().dialect.name
+    if dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        statement = mysql_insert(table).values(rows)
+        statement = statement.on_duplicate_key_update(
+            recipe_count=table.c.recipe_count + statement.inserted.recipe_count
+        )
+        db_session.execute(statement)
+        return
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
         else:
-            return self.ingredients.split(", ")
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.ingredient],
+            set_={'recipe_count': table.c.recipe_count + statement.excluded.recipe_count}
+        )
+        db_session.execute(statement)
+        return
+
+    # Databases without an upsert insert the rows that weren't there
+    for row in rows:
+        updated = db_session.query(IngredientCatalog).filter(
+            IngredientCatalog.ingredient == row['ingredient']
+        ).update(
+            {IngredientCatalog.recipe_count: IngredientCatalog.recipe_count + row['recipe_count']},
+            synchronize_session=False
+        )
+        if not updated:
+            db_session.add(IngredientCatalog(**row))
+
+def adjust_ingredient_catalog(ingredients, delta, db_session=None):
+    """
+    Add delta to the recipe count of each ingredient key in the catalog
+
+    New ingredients get a catalog entry and ingredients whose count drops
+    to zero are removed. Counts go up through add_ingredient_counts() and
+    down with UPDATE ... SET recipe_count = recipe_count + delta, so
+    concurrent sessions don't overwrite each other's changes. Ingredients
+    are changed in sorted order, so two sessions always lock catalog rows
+    in the same order. The caller is responsible for committing the session.
+    """
+    if db_session is None:
+        db_session = session
+    ingredients = sorted(set(ingredients))
+    if not ingredients or not delta:
+        return
+
+    if delta > 0:
+        add_ingredient_counts({ingredient: delta for ingredient in ingredients}, db_session)
+        return
+
+    for ingredient in ingredients:
+        db_session.query(IngredientCatalog).filter(
+            IngredientCatalog.ingredient == ingredient
+        ).update(
+            {IngredientCatalog.recipe_count: IngredientCatalog.recipe_count + delta},
+            synchronize_session=False
+        )
+    db_session.query(IngredientCatalog).filter(
+        IngredientCatalog.ingredient.in_(ingredients),
+        IngredientCatalog.recipe_count <= 0
+    ).delete(synchronize_session=False)
+
+def sync_ingredient_index(recipe, db_session=None):
+    """
+    Update the ingredient index rows and catalog counts of a recipe to match its ingredients
 
-# Create the table in the database
-Base.metadata.create_all(engine)
+    The recipe must already have an id (flush it first when it is new).
+    The caller is responsible for committing the session.
+    """
+    index_recipe_ingredients(recipe.id, recipe.return_ingredients_as_list(), db_session)
 
-print("SQLAlchemy setup completed successfully!")
-print(f"Connected to database: {database_name}")
-print("Recipe model and table created successfully!")
+def index_recipe_ingredients(recipe_id, ingredients, db_session=None):
+    """
+    Update the ingredient index rows and catalog counts of a recipe id to match a list of ingredients
+    The caller is responsible for committing the session.
+    """
+    if db_session is None:
+        db_session = session
+    # Ingredients currently indexed for this recipe
+    indexed = {
+        ingredient for (ingredient,) in db_session.query(RecipeIngredient.ingredient).filter(
+            RecipeIngredient.recipe_id == recipe_id
+        )
+    }
+    current = ingredient_keys(ingredients)
+
+    # Only touch the ingredients that actually changed
+    removed = [ingredient for ingredient in indexed if ingredient not in current]
+    added = [ingredient for ingredient in current if ingredient not in indexed]
+
+    if removed:
+        db_session.query(RecipeIngredient).filter(
+            RecipeIngredient.recipe_id == recipe_id,
+            RecipeIngredient.ingredient.in_(removed)
+        ).delete(synchronize_session=False)
+    for ingredient in added:
+        db_session.add(RecipeIngredient(ingredient=ingredient, recipe_id=recipe_id))
+
+    adjust_ingredient_catalog(removed, -1, db_session)
+    adjust_ingredient_catalog(added, 1, db_session)
+
+def remove_from_ingredient_index(recipe_id, db_session=None):
+    """
+    Remove every ingredient index row of a recipe and release its catalog counts
+    (used before deleting the recipe)
+    """
+    if db_session is None:
+        db_session = session
+    indexed = [
+        ingredient for (ingredient,) in db_session.query(RecipeIngredient.ingredient).filter(
+            RecipeIngredient.recipe_id == recipe_id
+        )
+    ]
+    db_session.query(RecipeIngredient).filter(
+        RecipeIngredient.recipe_id == recipe_id
+    ).delete(synchronize_session=False)
+    adjust_ingredient_catalog(indexed, -1, db_session)
+
+def rebuild_ingredient_index(chunk_size=5000):
+    """
+    Rebuild the whole ingredient index and catalog from the final_recipes table
+
+    Used once to backfill recipes that were stored before the index existed.
+    Recipes are read in keyset-ordered chunks and the index rows of each
+    chunk are written before the next one is read, so only one chunk and
+    the per-ingredient counts are held in memory. Everything is committed
+    at the end, in one transaction.
+    """
+    session.query(RecipeIngredient).delete(synchronize_session=False)
+    session.query(IngredientCatalog).delete(synchronize_session=False)
+
+    counts = {}
+    last_id = 0
+    while True:
+        rows = session.query(Recipe.id, Recipe.ingredients).filter(
+            Recipe.id > last_id
+        ).order_by(Recipe.id).limit(chunk_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        index_rows = []
+        for recipe_id, ingredients in rows:
+            keys = ingredient_keys([ingredients or ""])
+            for key in keys:
+                index_rows.append({'ingredient': key, 'recipe_id': recipe_id})
+            count_ingredients([keys], counts)
+        if index_rows:
+            session.execute(RecipeIngredient.__table__.insert(), index_rows)
+
+    if counts:
+        session.execute(IngredientCatalog.__table__.insert(), [
+            {'ingredient': ingredient, 'recipe_count': count}
+            for ingredient, count in counts.items()
+        ])
+    session.commit()
+
+def list_available_ingredients(db_session=None):
+    """
+    Return (ingredient key, recipe_count) pairs from the catalog in alphabetical order
+    """
+    if db_session is None:
+        db_session = session
+    return db_session.query(IngredientCatalog.ingredient, IngredientCatalog.recipe_count).order_by(
+        IngredientCatalog.ingredient
+    ).all()
+
+def query_recipes_by_ingredients(include, match_all=False, exclude=None, db_session=None):
+    """
+    Build a query for recipes matching an ingredient combination
+
+    Args:
+        include (list): Ingredients the recipes should contain
+        match_all (bool): True to require every ingredient (AND),
+            False to require at least one of them (OR)
+        exclude (list): Ingredients the recipes must not contain (NOT)
+
+    Returns:
+        Query: A query of Recipe objects ordered by id
+    """
+    if db_session is None:
+        db_session = session
+    include = ingredient_keys(include)
+    exclude = ingredient_keys(exclude or [])
+
+    query = db_session.query(Recipe)
+
+    if include:
+        # Recipe ids having the wanted ingredients, found through the index
+        matching_ids = db_session.query(RecipeIngredient.recipe_id).filter(
+            RecipeIngredient.ingredient.in_(include)
+        )
+        if match_all:
+            # Every wanted ingredient must be present for the recipe
+            matching_ids = matching_ids.group_by(RecipeIngredient.recipe_id).having(
+                func.count(RecipeIngredient.ingredient) == len(include)
+            )
+        query = query.filter(Recipe.id.in_(matching_ids))
+
+    if exclude:
+        # Drop recipes having any of the unwanted ingredients
+        excluded_ids = db_session.query(RecipeIngredient.recipe_id).filter(
+            RecipeIngredient.ingredient.in_(exclude)
+        )
+        query = query.filter(Recipe.id.notin_(excluded_ids))
+
+    return query.order_by(Recipe.id)
+
+# Listing Functions
+
+# Number of recipes shown per page and fetched per round trip when streaming
+PAGE_SIZE = 10
+STREAM_BATCH_SIZE = 500
+
+def fetch_recipe_page(after_id=0, page_size=PAGE_SIZE, db_session=None):
+    """
+    Return the next page of recipes ordered by id (keyset pagination)
+
+    Args:
+        after_id (int): Id of the last recipe of the previous page (0 for the first page)
+        page_size (int): Maximum number of recipes to return
+
+    Uses WHERE id > after_id instead of OFFSET, so every page costs the
+    same primary key range scan no matter how deep into the table it is.
+    """
+    if db_session is None:
+        db_session = session
+    return db_session.query(Recipe).filter(Recipe.id > after_id).order_by(Recipe.id).limit(page_size).all()
+
+def stream_all_recipes(batch_size=STREAM_BATCH_SIZE, db_session=None):
+    """
+    Generator yielding every recipe ordered by id through a server-side cursor
+
+    Rows are fetched batch_size at a time, so memory stays flat and the
+    first recipes are available before the whole table has been read.
+    """
+    if db_session is None:
+        db_session = session
+    query = db_session.query(Recipe).order_by(Recipe.id).execution_options(stream_results=True)
+    for recipe in query.yield_per(batch_size):
+        yield recipe
+
+def name_prefix_condition(prefix):
+    """
+    Return a condition matching names that start with prefix, as a range on the name index
+
+    Written as name >= prefix AND name < (prefix with its last character
+    incremented): SQLite doesn't use an index for LIKE ... ESCAPE, so
+    startswith() would read the whole index. Like the index, the range
+    compares case-sensitively.
+    """
+    # Characters that can't be incremented don't narrow the range
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return Recipe.name >= prefix
+    upper_bound = stem[:-1] + chr(ord(stem[-1]) + 1)
+    return (Recipe.name >= prefix) & (Recipe.name < upper_bound)
+
+def name_search_condition(text):
+    """
+    Return the condition find_recipes_by_name() filters on
+    MySQL uses the FULLTEXT index to match words anywhere in the name;
+    other databases match names starting with the text through the name index
+    """
+    if get_engine().dialect.name == 'mysql':
+        return Recipe.name.match(text)
+    return name_prefix_condition(text)
+
+def find_recipes_by_name(text, db_session=None):
+    """Return recipes whose name matches a search text (see name_search_condition()), ordered by name"""
+    if db_session is None:
+        db_session = session
+    return db_session.query(Recipe).filter(name_search_condition(text)).order_by(Recipe.name).all()
+
+# Recipe Cache Functions
+# Recipes looked up by id and the (id, name) listing are served from
+# in-process caches; every create/edit/delete invalidates what it changed
+
+# Plain snapshot of a recipe row, safe to keep after the session commits
+RecipeRecord = namedtuple('RecipeRecord', ['id', 'name', 'ingredients', 'cooking_time', 'difficulty'])
+
+RECIPE_CACHE_SIZE = 1000  # recipes kept in the cache
+RECIPE_CACHE_TTL = 300    # seconds before a cached entry is read again
+
+recipe_cache = LRUCache(max_size=RECIPE_CACHE_SIZE, ttl=RECIPE_CACHE_TTL)
+listing_cache = LRUCache(max_size=1, ttl=RECIPE_CACHE_TTL)
+
+def recipe_record(recipe):
+    """Return the RecipeRecord snapshot of a Recipe object"""
+    return RecipeRecord(recipe.id, recipe.name, recipe.ingredients, recipe.cooking_time, recipe.difficulty)
+
+def get_recipe_record(recipe_id, db_session=None):
+    """
+    Return the RecipeRecord with the given id, or None if there is no such recipe
+    Read through the recipe cache, so hot recipes need no database round trip
+    """
+    if db_session is None:
+        db_session = session
+    def load():
+        row = db_session.query(
+            Recipe.id, Recipe.name, Recipe.ingredients, Recipe.cooking_time, Recipe.difficulty
+        ).filter(Recipe.id == recipe_id).first()
+        return RecipeRecord(*row) if row else None
+    return recipe_cache.get(recipe_id, load)
+
+def list_recipe_names(db_session=None):
+    """
+    Return a dictionary of recipe id -> name, ordered by id
+    Read through the listing cache
+    """
+    if db_session is None:
+        db_session = session
+    return listing_cache.get('names', lambda: dict(
+        db_session.query(Recipe.id, Recipe.name).order_by(Recipe.id).all()
+    ))
+
+# Ingredient search results, shared between processes through a SQLite
+# file when RECIPE_SEARCH_CACHE names one
+SEARCH_CACHE_SIZE = 256  # searches kept in the cache
+search_cache = SearchResultCache(max_size=SEARCH_CACHE_SIZE, path=os.environ.get('RECIPE_SEARCH_CACHE'))
+
+def search_recipe_records(include, match_all=False, exclude=None, db_session=None):
+    """
+    Return RecipeRecords of the recipes matching an ingredient combination
+    Read through the search cache, so repeated searches need no database round trip
+    """
+    # Plain tuples are cached, so other processes can read them back
+    def load():
+        return [
+            tuple(recipe_record(recipe))
+            for recipe in query_recipes_by_ingredients(include, match_all=match_all, exclude=exclude, db_session=db_session)
+        ]
+    rows = search_cache.get(search_cache.make_key(include, match_all, exclude), load)
+    return [RecipeRecord(*row) for row in rows]
+
+def invalidate_recipe_cache(recipe_id=None):
+    """Drop a changed recipe (if given), the id -> name listing and all search results from the caches"""
+    if recipe_id is not None:
+        recipe_cache.invalidate(recipe_id)
+    listing_cache.clear()
+    search_cache.bump_generation()
+
+# Recipe Write Functions
+# Add a recipe, or change or delete one by id with a single UPDATE/DELETE
+# statement; the interactive menu functions below only add the prompts
+
+def check_cooking_time(cooking_time):
+    """Raise ValueError unless the cooking time is a non-negative whole number of minutes"""
+    if not isinstance(cooking_time, int) or isinstance(cooking_time, bool) or cooking_time < 0:
+        raise ValueError("Cooking time must be a non-negative whole number of minutes.")
+
+def add_recipe(name, cooking_time, ingredients, db_session=None):
+    """
+    Store a new recipe with its difficulty and index its ingredients, then commit
+
+    Args:
+        name (str): The name of the recipe (50 characters or less)
+        cooking_time (int): Cooking time in minutes
+        ingredients (list): List of ingredient strings
+
+    Returns:
+        RecipeRecord: The stored recipe
+    """
+    if db_session is None:
+        db_session = session
+    if not name or len(name) > 50:
+        raise ValueError("Recipe name must be between 1 and 50 characters.")
+    check_cooking_time(cooking_time)
+    
+    recipe_entry = Recipe(
+        name=name,
+        ingredients=", ".join(normalize_ingredients(ingredients)),
+        cooking_time=cooking_time
+    )
+    recipe_entry.calculate_difficulty()
+    
+    db_session.add(recipe_entry)
+    db_session.flush()
+    sync_ingredient_index(recipe_entry, db_session)
+    db_session.commit()
+    invalidate_recipe_cache(recipe_entry.id)
+    return recipe_record(recipe_entry)
+
+def update_recipe_by_id(recipe_id, name=None, ingredients=None, cooking_time=None, db_session=None):
+    """
+    Change the given attributes of a recipe and recalculate its difficulty, then commit
+
+    The difficulty is computed by the UPDATE statement itself, from the new
+    or stored cooking time and the new or indexed number of ingredients.
+
+    Args:
+        recipe_id (int): Id of the recipe to change
+        name (str): New name (50 characters or less), or None to keep it
+        ingredients (list): New list of ingredient strings, or None to keep them
+        cooking_time (int): New cooking time in minutes, or None to keep it
+
+    Returns:
+        bool: True if the recipe was updated, False if no recipe has this id
+    """
+    if db_session is None:
+        db_session = session
+    if name is not None and (not name or len(name) > 50):
+        raise ValueError("Recipe name must be between 1 and 50 characters.")
+    if cooking_time is not None:
+        check_cooking_time(cooking_time)
+    
+    values = {}
+    if name is not None:
+        values['name'] = name
+    if cooking_time is not None:
+        values['cooking_time'] = cooking_time
+    if ingredients is not None:
+        ingredients = normalize_ingredients(ingredients)
+        values['ingredients'] = ", ".join(ingredients)
+    if not values:
+        raise ValueError("Nothing to update.")
+    
+    # Recalculate the difficulty when one of its inputs changes
+    if cooking_time is not None or ingredients is not None:
+        if cooking_time is not None:
+            new_cooking_time = literal(cooking_time)
+        else:
+            new_cooking_time = Recipe.cooking_time
+        if ingredients is not None:
+            new_ingredient_count = literal(len(ingredients))
+        else:
+            new_ingredient_count = select(func.count()).where(
+                RecipeIngredient.recipe_id == Recipe.id
+            ).scalar_subquery()
+        values['difficulty'] = difficulty_expression(new_cooking_time, new_ingredient_count)
+    
+    result = db_session.execute(
+        update(Recipe).where(Recipe.id == recipe_id).values(**values),
+        execution_options={'synchronize_session': False}
+    )
+    if result.rowcount == 0:
+        db_session.rollback()
+        return False
+    
+    # Keep the ingredient index in sync when ingredients changed
+    if ingredients is not None:
+        index_recipe_ingredients(recipe_id, ingredients, db_session)
+    
+    db_session.commit()
+    invalidate_recipe_cache(recipe_id)
+    return True
+
+def delete_recipe_by_id(recipe_id, db_session=None):
+    """
+    Delete a recipe and its ingredient index entries, then commit
+
+    Returns:
+        bool: True if the recipe was deleted, False if no recipe has this id
+    """
+    if db_session is None:
+        db_session = session
+    # Index rows reference the recipe, so they go first
+    remove_from_ingredient_index(recipe_id, db_session)
+    result = db_session.execute(
+        delete(Recipe).where(Recipe.id == recipe_id),
+        execution_options={'synchronize_session': False}
+    )
+    if result.rowcount == 0:
+        db_session.rollback()
+        return False
+    
+    db_session.commit()
+    invalidate_recipe_cache(recipe_id)
+    return True
+
+# Recipe Service
+class RecipeService:
+    """
+    Recipe operations taking plain arguments and returning RecipeRecords
+
+    Nothing is read from input() or printed, so the menu, scripts, batch
+    jobs and load tests can all drive the application the same way.
+    Invalid arguments raise ValueError. Every write commits on its own.
+    """
+
+    def __init__(self, db_session=None):
+        """
+        Initialize a RecipeService object
+
+        Args:
+            db_session (Session): Session to work in (the calling thread's module session if None)
+        """
+        self.db_session = session if db_session is None else db_session
+
+    def create(self, name, cooking_time, ingredients):
+        """Store a new recipe and return it"""
+        return add_recipe(name, cooking_time, ingredients, self.db_session)
+
+    def get(self, recipe_id):
+        """Return the recipe with the given id, or None"""
+        return get_recipe_record(recipe_id, self.db_session)
+
+    def list(self, after_id=0, limit=PAGE_SIZE):
+        """Return up to limit recipes with an id above after_id, ordered by id"""
+        return [recipe_record(recipe) for recipe in fetch_recipe_page(after_id, limit, self.db_session)]
+
+    def ingredients(self):
+        """Return (ingredient, recipe_count) pairs from the ingredient catalog"""
+        return list_available_ingredients(self.db_session)
+
+    def search(self, include, match_all=False, exclude=None):
+        """Return the recipes matching an ingredient combination"""
+        return search_recipe_records(include, match_all, exclude, self.db_session)
+
+    def update(self, recipe_id, name=None, ingredients=None, cooking_time=None):
+        """Change the given attributes of a recipe and return it, or None if there is no such recipe"""
+        if not update_recipe_by_id(recipe_id, name, ingredients, cooking_time, self.db_session):
+            return None
+        return self.get(recipe_id)
+
+    def delete(self, recipe_id):
+        """Delete a recipe; return False if there is no such recipe"""
+        return delete_recipe_by_id(recipe_id, self.db_session)
+
+# Initialize the service used by the menu
+service = RecipeService()
+
+# Maintenance Functions
+
+def recalculate_all_difficulties(chunk_size=5000):
+    """
+    Recalculate the difficulty of every stored recipe, e.g. after changing thresholds
+
+    Reads (id, ingredients, cooking_time, difficulty) rows in keyset-ordered
+    chunks, computes the new difficulty codes of a whole chunk at once and
+    writes back only the rows whose difficulty actually changed, committing
+    once per chunk.
+
+    Returns:
+        int: Number of recipes whose difficulty changed
+    """
+    table = Recipe.__table__
+    update_statement = table.update().where(table.c.id == bindparam('recipe_id')).values(
+        difficulty=bindparam('new_difficulty')
+    )
+    changed_total = 0
+    last_id = 0
+
+    while True:
+        rows = session.query(Recipe.id, Recipe.ingredients, Recipe.cooking_time, Recipe.difficulty).filter(
+            Recipe.id > last_id
+        ).order_by(Recipe.id).limit(chunk_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        # Count ingredients the same way as Recipe.return_ingredients_as_list
+        cooking_times = [row.cooking_time or 0 for row in rows]
+        ingredient_counts = [len(normalize_ingredients([row.ingredients or ""])) for row in rows]
+        codes = difficulty_codes(cooking_times, ingredient_counts)
+
+        changes = []
+        for row, code in zip(rows, codes):
+            new_difficulty = DIFFICULTY_LEVELS[code]
+            if new_difficulty != row.difficulty:
+                changes.append({'recipe_id': row.id, 'new_difficulty': new_difficulty})
+
+        if changes:
+            session.execute(update_statement, changes)
+        session.commit()
+        changed_total += len(changes)
+        
+        # Cached records and search results may hold the old difficulty
+        if changes:
+            recipe_cache.clear()
+            search_cache.bump_generation()
+        print(f"Checked recipes up to id {last_id}, {changed_total} difficulties changed so far.")
+
+    return changed_total
+
+# Database Setup
+
+def create_fulltext_index(engine):
+    """
+    Create the FULLTEXT index on recipe names that find_recipes_by_name() uses on MySQL
+
+    Declared on first use rather than in Recipe.__table_args__: its
+    mysql_prefix option imports the MySQL dialect, which importing this
+    module must not do.
+    """
+    table = Recipe.__table__
+    index = next((index for index in table.indexes if index.name == 'ix_final_recipes_name_fulltext'), None)
+    if index is None:
+        index = Index('ix_final_recipes_name_fulltext', table.c.name, mysql_prefix='FULLTEXT')
+    index.create(engine, checkfirst=True)
+
+def init_db():
+    """
+    Create the tables and backfill the ingredient index (the migrate/init step)
+    Run once before using a new database; safe to run again
+    """
+    # Create the tables in the database
+    Base.metadata.create_all(get_engine())
+    
+    # Add indexes declared after the tables were first created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(get_engine(), checkfirst=True)
+    if get_engine().dialect.name == 'mysql':
+        create_fulltext_index(get_engine())
+    
+    # Backfill the index and catalog for recipes stored before they existed,
+    # or before they were keyed by ingredient_key()
+    catalog = [ingredient for (ingredient,) in session.query(IngredientCatalog.ingredient)]
+    if any(ingredient != ingredient_key(ingredient) for ingredient in catalog) or (
+            not catalog and session.query(Recipe).first() is not None):
+        rebuild_ingredient_index()
+    
+    print("SQLAlchemy setup completed successfully!")
+    print(f"Connected to database: {get_engine().url.database}")
+    print("Recipe model and table created successfully!")
 
 # Main Operations Functions
 
@@ -126,64 +979,69 @@ def create_recipe():
         if ingredient:
             ingredients.append(ingredient)
     
-    # Convert ingredients list to string
-    ingredients_str = ", ".join(ingredients)
+    # Store the recipe and index its ingredients
+    recipe = service.create(name, cooking_time, ingredients)
     
-    # Create recipe entry
-    recipe_entry = Recipe(
-        name=name,
-        ingredients=ingredients_str,
-        cooking_time=cooking_time
-    )
-    
-    # Calculate difficulty
-    recipe_entry.calculate_difficulty()
-    
-    # Add to database
-    session.add(recipe_entry)
-    session.commit()
-    
-    print(f"\nRecipe '{name}' with difficulty '{recipe_entry.difficulty}' has been added successfully!")
+    print(f"\nRecipe '{name}' with difficulty '{recipe.difficulty}' has been added successfully!")
 
 def view_all_recipes():
-    """Function to view all recipes"""
+    """Function to view all recipes, page by page or streamed in one go"""
     print("\n--- All Recipes ---")
     
-    # Retrieve all recipes
-    all_recipes = session.query(Recipe).all()
+    # Retrieve the first page to check if there is anything to show
+    page = service.list()
     
-    if not all_recipes:
+    if not page:
         print("There are no entries in the database.")
         return None
     
-    # Display each recipe
-    for recipe in all_recipes:
-        print(recipe)
+    mode = input("Show recipes page by page or all at once? (page/all): ").strip().lower()
+    
+    if mode == 'all':
+        # Display each recipe as soon as it arrives from the database
+        for recipe in stream_all_recipes():
+            print(recipe)
+        return None
+    
+    # Display one page at a time
+    page_number = 1
+    while page:
+        print(f"\nPage {page_number}:")
+        for record in page:
+            print(Recipe(**record._asdict()))
+        
+        if len(page) < PAGE_SIZE:
+            print("\nEnd of the recipe list.")
+            break
+        
+        choice = input("\nPress Enter for the next page or type 'q' to stop: ").strip().lower()
+        if choice == 'q':
+            break
+        
+        # Continue after the last recipe shown
+        page = service.list(after_id=page[-1].id)
+        page_number += 1
+        if not page:
+            print("\nEnd of the recipe list.")
 
 def search_by_ingredients():
     """Function to search recipes by ingredients"""
     print("\n--- Search by Ingredients ---")
     
-    # Check if table has any entries
-    if session.query(Recipe).count() == 0:
+    # Get all distinct ingredients from the catalog
+    catalog = service.ingredients()
+    
+    # Check if there is anything to search
+    if not catalog:
         print("There are no entries in the database.")
         return None
     
-    # Get all ingredients from database
-    results = session.query(Recipe.ingredients).all()
-    
-    # Extract all unique ingredients
-    all_ingredients = []
-    for result in results:
-        ingredients_list = result[0].split(", ")
-        for ingredient in ingredients_list:
-            if ingredient and ingredient not in all_ingredients:
-                all_ingredients.append(ingredient)
+    all_ingredients = [ingredient for ingredient, _ in catalog]
     
     # Display ingredients with numbers
     print("\nAvailable ingredients:")
-    for i, ingredient in enumerate(all_ingredients, 1):
-        print(f"{i}. {ingredient}")
+    for i, (ingredient, recipe_count) in enumerate(catalog, 1):
+        print(f"{i}. {ingredient} ({recipe_count} recipes)")
     
     # Get user selection
     try:
@@ -203,20 +1061,42 @@ def search_by_ingredients():
         print("Invalid input. Please enter numbers separated by spaces.")
         return None
     
-    # Create search conditions
-    conditions = []
-    for ingredient in search_ingredients:
-        like_term = f"%{ingredient}%"
-        conditions.append(Recipe.ingredients.like(like_term))
+    # Ask whether all or any of the selected ingredients must be present
+    match_all = False
+    if len(search_ingredients) > 1:
+        mode = input("Match all selected ingredients or any of them? (all/any): ").strip().lower()
+        match_all = mode == 'all'
+    
+    # Get ingredients to exclude
+    try:
+        excluded_numbers = input("Enter the numbers of ingredients to exclude (leave blank for none): ").split()
+        excluded_numbers = [int(num) for num in excluded_numbers]
+        
+        # Validate selections
+        for num in excluded_numbers:
+            if num < 1 or num > len(all_ingredients):
+                print("Invalid selection. Please try again.")
+                return None
+        
+        # Create excluded ingredients list
+        excluded_ingredients = [all_ingredients[num - 1] for num in excluded_numbers]
+        
+    except ValueError:
+        print("Invalid input. Please enter numbers separated by spaces.")
+        return None
     
-    # Search for recipes
-    from sqlalchemy import or_
-    recipes_found = session.query(Recipe).filter(or_(*conditions)).all()
+    # Search for recipes through the ingredient index (cached)
+    recipes_found = service.search(
+        search_ingredients, match_all=match_all, exclude=excluded_ingredients
+    )
     
     if recipes_found:
-        print(f"\nRecipes containing {', '.join(search_ingredients)}:")
-        for recipe in recipes_found:
-            print(recipe)
+        joiner = " and " if match_all else " or "
+        print(f"\nRecipes containing {joiner.join(search_ingredients)}:")
+        if excluded_ingredients:
+            print(f"(excluding {', '.join(excluded_ingredients)})")
+        for record in recipes_found:
+            print(Recipe(**record._asdict()))
     else:
         print("No recipes found with the selected ingredients.")
 
@@ -224,17 +1104,17 @@ def edit_recipe():
     """Function to edit an existing recipe"""
     print("\n--- Edit Recipe ---")
     
+    # Get all recipe IDs and names (cached)
+    results = list_recipe_names()
+    
     # Check if any recipes exist
-    if session.query(Recipe).count() == 0:
+    if not results:
         print("There are no entries in the database.")
         return None
     
-    # Get all recipe IDs and names
-    results = session.query(Recipe.id, Recipe.name).all()
-    
     # Display available recipes
     print("\nAvailable recipes:")
-    for recipe_id, name in results:
+    for recipe_id, name in results.items():
         print(f"{recipe_id}. {name}")
     
     # Get user selection
@@ -242,7 +1122,7 @@ def edit_recipe():
         selected_id = int(input("\nEnter the ID of the recipe you want to edit: "))
         
         # Check if ID exists
-        if not any(recipe_id == selected_id for recipe_id, _ in results):
+        if selected_id not in results:
             print("Recipe ID not found.")
             return None
             
@@ -250,14 +1130,18 @@ def edit_recipe():
         print("Invalid input. Please enter a valid ID.")
         return None
     
-    # Retrieve the recipe to edit
-    recipe_to_edit = session.query(Recipe).filter(Recipe.id == selected_id).first()
+    # Retrieve the recipe details to display (cached)
+    record = service.get(selected_id)
+    if record is None:
+        print("Recipe ID not found.")
+        invalidate_recipe_cache(selected_id)
+        return None
     
     # Display editable attributes
-    print(f"\nEditing recipe: {recipe_to_edit.name}")
-    print("1. Name:", recipe_to_edit.name)
-    print("2. Ingredients:", recipe_to_edit.ingredients)
-    print("3. Cooking Time:", recipe_to_edit.cooking_time, "minutes")
+    print(f"\nEditing recipe: {record.name}")
+    print("1. Name:", record.name)
+    print("2. Ingredients:", record.ingredients)
+    print("3. Cooking Time:", record.cooking_time, "minutes")
     
     # Get user choice
     try:
@@ -270,6 +1154,7 @@ def edit_recipe():
         return None
     
     # Edit based on choice
+    changes = {}
     if choice == 1:
         # Edit name
         while True:
@@ -279,7 +1164,7 @@ def edit_recipe():
             elif len(new_name) == 0:
                 print("Name cannot be empty.")
             else:
-                recipe_to_edit.name = new_name
+                changes['name'] = new_name
                 break
                 
     elif choice == 2:
@@ -291,7 +1176,7 @@ def edit_recipe():
                 ingredient = input(f"Enter ingredient {i + 1}: ").strip()
                 if ingredient:
                     ingredients.append(ingredient)
-            recipe_to_edit.ingredients = ", ".join(ingredients)
+            changes['ingredients'] = ingredients
         except ValueError:
             print("Invalid number of ingredients.")
             return None
@@ -301,33 +1186,32 @@ def edit_recipe():
         while True:
             cooking_time_input = input("Enter new cooking time (minutes): ").strip()
             if cooking_time_input.isnumeric():
-                recipe_to_edit.cooking_time = int(cooking_time_input)
+                changes['cooking_time'] = int(cooking_time_input)
                 break
             else:
                 print("Cooking time must be a number.")
     
-    # Recalculate difficulty
-    recipe_to_edit.calculate_difficulty()
-    
-    # Commit changes
-    session.commit()
-    print("Recipe updated successfully!")
+    # Save the change (the difficulty is recalculated by the update)
+    if service.update(selected_id, **changes):
+        print("Recipe updated successfully!")
+    else:
+        print("Recipe ID not found.")
 
 def delete_recipe():
     """Function to delete a recipe"""
     print("\n--- Delete Recipe ---")
     
+    # Get all recipe IDs and names (cached)
+    results = list_recipe_names()
+    
     # Check if any recipes exist
-    if session.query(Recipe).count() == 0:
+    if not results:
         print("There are no entries in the database.")
         return None
     
-    # Get all recipe IDs and names
-    results = session.query(Recipe.id, Recipe.name).all()
-    
     # Display available recipes
     print("\nAvailable recipes:")
-    for recipe_id, name in results:
+    for recipe_id, name in results.items():
         print(f"{recipe_id}. {name}")
     
     # Get user selection
@@ -335,7 +1219,7 @@ def delete_recipe():
         selected_id = int(input("\nEnter the ID of the recipe you want to delete: "))
         
         # Check if ID exists
-        if not any(recipe_id == selected_id for recipe_id, _ in results):
+        if selected_id not in results:
             print("Recipe ID not found.")
             return None
             
@@ -343,16 +1227,14 @@ def delete_recipe():
         print("Invalid input. Please enter a valid ID.")
         return None
     
-    # Get the recipe to delete
-    recipe_to_delete = session.query(Recipe).filter(Recipe.id == selected_id).first()
-    
     # Confirm deletion
-    confirm = input(f"Are you sure you want to delete '{recipe_to_delete.name}'? (yes/no): ").lower().strip()
+    confirm = input(f"Are you sure you want to delete '{results[selected_id]}'? (yes/no): ").lower().strip()
     
     if confirm == 'yes':
-        session.delete(recipe_to_delete)
-        session.commit()
-        print("Recipe deleted successfully!")
+        if service.delete(selected_id):
+            print("Recipe deleted successfully!")
+        else:
+            print("Recipe ID not found.")
     else:
         print("Deletion cancelled.")
 
@@ -390,11 +1272,25 @@ def main_menu():
         else:
             print("Invalid input. Please try again.")
     
-    # Close session and engine
-    session.close()
-    engine.dispose()
+    # Report how well the caches worked
+    for cache_name, cache in (("Recipe", recipe_cache), ("Search", search_cache)):
+        stats = cache.stats()
+        print(f"{cache_name} cache: {stats['hits']} hits, {stats['misses']} misses")
+    search_cache.close()
+    
+    # Close this thread's session and the engine
+    session.remove()
+    if engine is not None:
+        engine.dispose()
     print("Session and engine closed. Goodbye!")
 
 # Run the application
+# 'python recipe_app.py init' only creates/migrates the tables
+# 'python recipe_app.py recalculate' recalculates every stored difficulty
 if __name__ == "__main__":
-    main_menu()
\ No newline at end of file
+    init_db()
+    if sys.argv[1:] == ['recalculate']:
+        changed = recalculate_all_difficulties()
+        print(f"Difficulty recalculation finished: {changed} recipes changed.")
+    elif sys.argv[1:] != ['init']:
+        main_menu()
\ No newline at end of file
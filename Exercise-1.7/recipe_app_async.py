@@ -0,0 +1,184 @@
+"""
+Asyncio variant of the recipe application's data layer
+
+Uses SQLAlchemy's async engine (aiomysql for MySQL, aiosqlite for local
+SQLite files) so one worker can keep many queries in flight. Every
+function opens its own AsyncSession and transaction, so they can safely
+run concurrently, e.g. with asyncio.gather().
+
+The functions take plain arguments instead of prompting with input(),
+and share the models and ingredient index helpers of recipe_app.py.
+"""
+
+import asyncio
+import os
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session as OrmSession
+
+from recipe_app import (
+    Base, Recipe, username, password, hostname, database_name,
+    normalize_ingredients, check_cooking_time, sync_ingredient_index, remove_from_ingredient_index,
+    list_available_ingredients, query_recipes_by_ingredients, invalidate_recipe_cache
+)
+
+# Async database URL; use e.g. 'sqlite+aiosqlite:///recipes.db' locally
+async_database_url = os.environ.get(
+    'RECIPE_ASYNC_DATABASE_URL',
+    f'mysql+aiomysql://{username}:{password}@{hostname}/{database_name}'
+)
+
+# Async engine object, created on first database access by get_async_engine()
+async_engine = None
+
+def get_async_engine():
+    """Return the async engine, creating it on first use"""
+    global async_engine
+    if async_engine is None:
+        async_engine = create_async_engine(async_database_url)
+    return async_engine
+
+class AsyncRecipeSession(OrmSession):
+    """Sync session behind each AsyncSession, looking up the engine lazily"""
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        """Return the sync side of the lazily created async engine"""
+        return get_async_engine().sync_engine
+
+# Factory of AsyncSessions using the lazy engine lookup
+# Objects stay readable after commit so they can be returned to callers
+AsyncRecipeSessionFactory = async_sessionmaker(sync_session_class=AsyncRecipeSession, expire_on_commit=False)
+
+async def init_models():
+    """Create the recipe tables if they don't exist yet"""
+    async with get_async_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+async def create_recipe(name, cooking_time, ingredients):
+    """
+    Create a new recipe and index its ingredients
+
+    Args:
+        name (str): The name of the recipe (50 characters or less)
+        cooking_time (int): Cooking time in minutes
+        ingredients (list): List of ingredient strings
+
+    Returns:
+        Recipe: The stored recipe with its id and difficulty set
+    """
+    if not name or len(name) > 50:
+        raise ValueError("Recipe name must be between 1 and 50 characters.")
+    check_cooking_time(cooking_time)
+
+    recipe_entry = Recipe(
+        name=name,
+        ingredients=", ".join(normalize_ingredients(ingredients)),
+        cooking_time=cooking_time
+    )
+    recipe_entry.calculate_difficulty()
+
+    async with AsyncRecipeSessionFactory() as session:
+        async with session.begin():
+            session.add(recipe_entry)
+            await session.flush()
+            await session.run_sync(lambda sync_session: sync_ingredient_index(recipe_entry, sync_session))
+    invalidate_recipe_cache(recipe_entry.id)
+    return recipe_entry
+
+async def view_all_recipes():
+    """Return a list of all recipes ordered by id"""
+    async with AsyncRecipeSessionFactory() as session:
+        result = await session.scalars(select(Recipe).order_by(Recipe.id))
+        return result.all()
+
+async def list_ingredients():
+    """Return (ingredient, recipe_count) pairs from the ingredient catalog"""
+    async with AsyncRecipeSessionFactory() as session:
+        return await session.run_sync(lambda sync_session: list_available_ingredients(sync_session))
+
+async def search_by_ingredients(include, match_all=False, exclude=None):
+    """
+    Return recipes matching an ingredient combination
+
+    Args:
+        include (list): Ingredients the recipes should contain
+        match_all (bool): True to require every ingredient, False for any of them
+        exclude (list): Ingredients the recipes must not contain
+    """
+    async with AsyncRecipeSessionFactory() as session:
+        return await session.run_sync(
+            lambda sync_session: query_recipes_by_ingredients(
+                include, match_all=match_all, exclude=exclude, db_session=sync_session
+            ).all()
+        )
+
+async def edit_recipe(recipe_id, name=None, ingredients=None, cooking_time=None):
+    """
+    Change the given attributes of a recipe and recalculate its difficulty
+
+    Returns:
+        Recipe: The updated recipe, or None if no recipe has this id
+    """
+    if name is not None and (not name or len(name) > 50):
+        raise ValueError("Recipe name must be between 1 and 50 characters.")
+    if cooking_time is not None:
+        check_cooking_time(cooking_time)
+
+    async with AsyncRecipeSessionFactory() as session:
+        async with session.begin():
+            recipe_to_edit = await session.get(Recipe, recipe_id)
+            if recipe_to_edit is None:
+                return None
+
+            if name is not None:
+                recipe_to_edit.name = name
+            if cooking_time is not None:
+                recipe_to_edit.cooking_time = cooking_time
+            if ingredients is not None:
+                recipe_to_edit.ingredients = ", ".join(normalize_ingredients(ingredients))
+                await session.run_sync(lambda sync_session: sync_ingredient_index(recipe_to_edit, sync_session))
+
+            recipe_to_edit.calculate_difficulty()
+    invalidate_recipe_cache(recipe_id)
+    return recipe_to_edit
+
+async def delete_recipe(recipe_id):
+    """
+    Delete a recipe and its ingredient index entries
+
+    Returns:
+        bool: True if the recipe was deleted, False if no recipe has this id
+    """
+    async with AsyncRecipeSessionFactory() as session:
+        async with session.begin():
+            recipe_to_delete = await session.get(Recipe, recipe_id)
+            if recipe_to_delete is None:
+                return False
+            await session.run_sync(lambda sync_session: remove_from_ingredient_index(recipe_id, sync_session))
+            await session.delete(recipe_to_delete)
+    invalidate_recipe_cache(recipe_id)
+    return True
+
+async def main():
+    """Small demo running several operations concurrently"""
+    await init_models()
+
+    tea, coffee = await asyncio.gather(
+        create_recipe("Tea", 5, ["Tea Leaves", "Sugar", "Water"]),
+        create_recipe("Coffee", 5, ["Coffee Powder", "Sugar", "Water"])
+    )
+    print(f"Created {tea!r} and {coffee!r}")
+
+    with_sugar, with_tea_leaves = await asyncio.gather(
+        search_by_ingredients(["Sugar"]),
+        search_by_ingredients(["Tea Leaves"])
+    )
+    print(f"Recipes with Sugar: {[recipe.name for recipe in with_sugar]}")
+    print(f"Recipes with Tea Leaves: {[recipe.name for recipe in with_tea_leaves]}")
+
+    await asyncio.gather(delete_recipe(tea.id), delete_recipe(coffee.id))
+    await get_async_engine().dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,376 @@
+"""
+Bulk recipe importer for the SQLAlchemy recipe application
+
+Streams recipes from a CSV or JSON Lines file and inserts them into the
+final_recipes table in chunks, one transaction per chunk, keeping the
+ingredient index and ingredient catalog in sync.
+
+CSV files need a header row with the columns name, ingredients and
+cooking_time, where ingredients is a comma-separated string.
+JSON Lines files hold one object per line with the same keys; there
+ingredients may also be a list of strings.
+
+Usage:
+    python recipe_import.py recipes.csv
+    python recipe_import.py recipes.jsonl --chunk-size 5000
+    python recipe_import.py dump.jsonl --parallel --workers 8
+
+With --parallel the file is split into byte ranges that worker processes
+parse, validate, normalize and score, while this process alone writes the
+results; throughput is reported per stage. It needs one record per line.
+
+The importer assigns recipe ids itself (continuing after the highest
+existing id), so it should not run while other programs add recipes.
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+
+from recipe_app import (
+    init_db, session, Recipe, RecipeIngredient, add_ingredient_counts,
+    count_ingredients, difficulty_level, ingredient_key, normalize_ingredients, search_cache
+)
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_SHARD_SIZE = 8 * 1024 * 1024  # bytes of input per parallel work item
+
+
+def read_records(filename, file_format):
+    """
+    Generator yielding (line_number, record dictionary) pairs from the input file
+    Records are read one at a time so the whole file is never held in memory
+    """
+    with open(filename, newline='', encoding='utf-8') as file:
+        if file_format == 'csv':
+            reader = csv.DictReader(file)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_number, line in enumerate(file, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError:
+                    # Malformed lines are reported as invalid records
+                    yield line_number, None
+
+
+def prepare_record(record):
+    """
+    Validate one input record and turn it into a final_recipes row
+
+    Returns:
+        tuple: (column values without id, ingredient keys for the index),
+            or None if the record is invalid
+    """
+    if not isinstance(record, dict):
+        return None
+
+    name = str(record.get('name') or '').strip()
+    if not name or len(name) > 50:
+        return None
+
+    try:
+        cooking_time = int(record.get('cooking_time'))
+    except (TypeError, ValueError):
+        return None
+    if cooking_time < 0:
+        return None
+
+    ingredients = record.get('ingredients') or []
+    if isinstance(ingredients, str):
+        ingredients = [ingredients]
+    # Stored, indexed and scored the same way as add_recipe(): split on
+    # commas, stripped, without duplicates
+    ingredients = normalize_ingredients(str(ingredient) for ingredient in ingredients)
+
+    ingredients_str = ", ".join(ingredients)
+    if len(ingredients_str) > 255:
+        return None
+
+    row = {
+        'name': name,
+        'ingredients': ingredients_str,
+        'cooking_time': cooking_time,
+        'difficulty': difficulty_level(cooking_time, len(ingredients))
+    }
+    return row, [ingredient_key(ingredient) for ingredient in ingredients]
+
+
+def insert_chunk(rows, ingredient_lists):
+    """
+    Insert one chunk of prepared rows with their index entries in a single transaction
+
+    Args:
+        rows (list): Row dictionaries from prepare_record()
+        ingredient_lists (list): Ingredient keys of each row, from prepare_record()
+    """
+    # Continue numbering after the highest id currently stored
+    next_id = (session.query(func.max(Recipe.id)).scalar() or 0) + 1
+
+    index_rows = []
+    for offset, (row, ingredients) in enumerate(zip(rows, ingredient_lists)):
+        row['id'] = next_id + offset
+        for ingredient in ingredients:
+            index_rows.append({'ingredient': ingredient, 'recipe_id': row['id']})
+
+    session.execute(Recipe.__table__.insert(), rows)
+    if index_rows:
+        session.execute(RecipeIngredient.__table__.insert(), index_rows)
+        # One upsert per chunk, counted from the same keys as the index rows
+        add_ingredient_counts(count_ingredients(ingredient_lists), session)
+    session.commit()
+
+
+def import_recipes(filename, file_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Import every valid recipe of a file, chunk by chunk
+
+    A chunk that fails to insert is rolled back and reported; the import
+    then carries on with the next chunk.
+
+    Returns:
+        dict: Counts of imported, skipped (invalid) and failed records
+    """
+    stats = {'imported': 0, 'skipped': 0, 'failed': 0}
+    records = read_records(filename, file_format)
+    start = time.perf_counter()
+
+    while True:
+        batch = list(islice(records, chunk_size))
+        if not batch:
+            break
+
+        rows = []
+        ingredient_lists = []
+        for line_number, record in batch:
+            prepared = prepare_record(record)
+            if prepared is None:
+                print(f"Skipping invalid record on line {line_number}.")
+                stats['skipped'] += 1
+            else:
+                rows.append(prepared[0])
+                ingredient_lists.append(prepared[1])
+
+        if not rows:
+            continue
+
+        try:
+            insert_chunk(rows, ingredient_lists)
+            stats['imported'] += len(rows)
+        except SQLAlchemyError as err:
+            session.rollback()
+            stats['failed'] += len(rows)
+            print(f"Error importing chunk ending on line {batch[-1][0]}: {err}")
+
+        elapsed = time.perf_counter() - start
+        print(f"{stats['imported']} recipes imported ({stats['imported'] / elapsed:.0f} recipes/s)")
+
+    # Cached search results (possibly shared with running apps) are now stale
+    if stats['imported']:
+        search_cache.bump_generation()
+    return stats
+
+
+def plan_shards(filename, file_format, shard_size=DEFAULT_SHARD_SIZE):
+    """
+    Split a file into byte ranges of about shard_size bytes for the import workers
+
+    Returns:
+        tuple: (CSV header fields or None, list of (start, end) byte ranges)
+    """
+    with open(filename, 'rb') as file:
+        header = None
+        if file_format == 'csv':
+            header = next(csv.reader([file.readline().decode('utf-8')]), None)
+            if not header:
+                return None, []
+        data_start = file.tell()
+        size = file.seek(0, os.SEEK_END)
+
+    shards = [(start, min(start + shard_size, size)) for start in range(data_start, size, shard_size)]
+    return header, shards
+
+
+def read_shard_lines(filename, start, end):
+    """
+    Generator yielding (byte offset, line) pairs for the lines starting in [start, end)
+    A line crossing the end belongs to this shard, so every line is read by exactly one shard
+    """
+    with open(filename, 'rb') as file:
+        if start > 0:
+            # Skip the rest of the line the previous shard is reading
+            file.seek(start - 1)
+            file.readline()
+        offset = file.tell()
+        while offset < end:
+            line = file.readline()
+            if not line:
+                break
+            yield offset, line.decode('utf-8')
+            offset += len(line)
+
+
+def prepare_shard(filename, file_format, header, start, end):
+    """
+    Parse, validate, normalize and score every record of one shard (runs in a worker process)
+
+    Returns:
+        tuple: (rows, ingredient key lists, byte offsets of invalid
+            records, seconds spent)
+    """
+    started = time.perf_counter()
+    rows = []
+    ingredient_lists = []
+    invalid = []
+
+    for offset, line in read_shard_lines(filename, start, end):
+        if not line.strip():
+            continue
+        if file_format == 'csv':
+            record = dict(zip(header, next(csv.reader([line]))))
+        else:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+
+        prepared = prepare_record(record)
+        if prepared is None:
+            invalid.append(offset)
+            continue
+        rows.append(prepared[0])
+        ingredient_lists.append(prepared[1])
+
+    return rows, ingredient_lists, invalid, time.perf_counter() - started
+
+
+def import_recipes_parallel(filename, file_format, chunk_size=DEFAULT_CHUNK_SIZE,
+                            workers=DEFAULT_WORKERS, shard_size=DEFAULT_SHARD_SIZE):
+    """
+    Import a file with worker processes preparing records and this process writing them
+
+    The file is split into byte-range shards. Each worker process parses,
+    validates, normalizes and scores whole shards, and this process, as
+    the only writer, inserts the results in chunks of chunk_size in file
+    order. At most two shards per worker are in flight, so memory use
+    doesn't grow with the file size.
+
+    Every record must be on one line: CSV fields containing line breaks
+    need the serial import.
+
+    Returns:
+        dict: Counts of imported, skipped (invalid) and failed records
+    """
+    stats = {'imported': 0, 'skipped': 0, 'failed': 0}
+    header, shards = plan_shards(filename, file_format, shard_size)
+    prepared = 0
+    prepare_seconds = 0.0  # summed over the workers
+    write_seconds = 0.0
+    wait_seconds = 0.0     # writer idle, waiting for prepared shards
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        shard_iter = iter(shards)
+        pending = deque(
+            executor.submit(prepare_shard, filename, file_format, header, shard_start, shard_end)
+            for shard_start, shard_end in islice(shard_iter, 2 * workers)
+        )
+
+        while pending:
+            waited = time.perf_counter()
+            rows, ingredient_lists, invalid, seconds = pending.popleft().result()
+            wait_seconds += time.perf_counter() - waited
+
+            # Keep the workers busy while this shard is written
+            for shard_start, shard_end in islice(shard_iter, 1):
+                pending.append(executor.submit(prepare_shard, filename, file_format, header, shard_start, shard_end))
+
+            prepared += len(rows) + len(invalid)
+            prepare_seconds += seconds
+            for offset in invalid:
+                print(f"Skipping invalid record at byte {offset}.")
+            stats['skipped'] += len(invalid)
+
+            written = time.perf_counter()
+            for chunk_start in range(0, len(rows), chunk_size):
+                chunk = rows[chunk_start:chunk_start + chunk_size]
+                try:
+                    insert_chunk(chunk, ingredient_lists[chunk_start:chunk_start + chunk_size])
+                    stats['imported'] += len(chunk)
+                except SQLAlchemyError as err:
+                    session.rollback()
+                    stats['failed'] += len(chunk)
+                    print(f"Error importing chunk of {len(chunk)} recipes: {err}")
+            write_seconds += time.perf_counter() - written
+
+            elapsed = time.perf_counter() - start
+            print(f"{stats['imported']} recipes imported ({stats['imported'] / elapsed:.0f} recipes/s)")
+
+    # Cached search results (possibly shared with running apps) are now stale
+    if stats['imported']:
+        search_cache.bump_generation()
+
+    # Throughput of each stage, to see whether preparing or writing limits the import
+    elapsed = time.perf_counter() - start
+    print(f"\nPrepare (parse, normalize, score): {prepared} records in {prepare_seconds:.2f}s of worker time "
+          f"({prepared / prepare_seconds if prepare_seconds else 0:.0f} records/s per worker, {workers} workers)")
+    print(f"Write: {stats['imported']} recipes in {write_seconds:.2f}s "
+          f"({stats['imported'] / write_seconds if write_seconds else 0:.0f} recipes/s)")
+    print(f"Writer waiting for workers: {wait_seconds:.2f}s")
+    print(f"Overall: {elapsed:.2f}s ({stats['imported'] / elapsed if elapsed else 0:.0f} recipes/s)")
+    return stats
+
+
+def main():
+    """Parse command-line arguments and run the import"""
+    parser = argparse.ArgumentParser(description="Bulk import recipes from a CSV or JSON Lines file.")
+    parser.add_argument('filename', help="CSV or JSON Lines file to import")
+    parser.add_argument('--format', choices=['csv', 'jsonl'],
+                        help="Input format (default: guessed from the file extension)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Recipes inserted per transaction (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument('--parallel', action='store_true',
+                        help="Prepare records in worker processes (one record per line)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"Worker processes for --parallel (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE,
+                        help=f"Input bytes per worker task for --parallel (default: {DEFAULT_SHARD_SIZE})")
+    args = parser.parse_args()
+
+    file_format = args.format or ('csv' if args.filename.lower().endswith('.csv') else 'jsonl')
+
+    # Make sure the tables exist before importing
+    init_db()
+
+    try:
+        if args.parallel:
+            stats = import_recipes_parallel(args.filename, file_format, max(1, args.chunk_size),
+                                            max(1, args.workers), max(1, args.shard_size))
+        else:
+            stats = import_recipes(args.filename, file_format, max(1, args.chunk_size))
+    except FileNotFoundError:
+        print(f"File '{args.filename}' not found.")
+        return
+    except csv.Error as err:
+        print(f"Could not read '{args.filename}': {err}")
+        return
+
+    print(f"\nImport finished: {stats['imported']} imported, "
+          f"{stats['skipped']} skipped, {stats['failed']} failed.")
+
+
+if __name__ == "__main__":
+    main()
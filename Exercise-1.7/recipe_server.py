@@ -0,0 +1,290 @@
+"""
+HTTP/JSON API for the recipe application
+
+Serves the RecipeService operations of recipe_app.py over HTTP using only
+the standard library:
+
+    GET    /recipes?after_id=0&limit=10      list recipes by id (keyset paging)
+    POST   /recipes                          create a recipe
+    GET    /recipes/<id>                     get one recipe
+    PATCH  /recipes/<id>                     change name, ingredients and/or cooking_time
+    DELETE /recipes/<id>                     delete a recipe
+    GET    /recipes/search?ingredient=Sugar&ingredient=Egg&match=all&exclude=Milk
+    GET    /ingredients                      ingredient catalog with recipe counts
+
+Request and response bodies are JSON objects; recipes look like
+{"id": 1, "name": "Tea", "ingredients": "Tea Leaves, Sugar, Water",
+"cooking_time": 5, "difficulty": "Easy"}. POST and PATCH take ingredients
+as a list of strings.
+
+Connections are handled by a fixed pool of worker threads. Connections are
+kept alive between requests (HTTP/1.1), and a connection that stays idle
+for KEEP_ALIVE_TIMEOUT seconds is closed so its worker can take the next
+one. Every request gets its own database session (recipe_app.session_scope),
+rolled back if the request fails and closed before the response is sent.
+Responses larger than GZIP_MIN_SIZE bytes are gzipped for clients that
+accept it.
+
+Usage:
+    python recipe_server.py --port 8000 --workers 16
+    RECIPE_DATABASE_URL=sqlite:///recipes.db python recipe_server.py
+"""
+
+import argparse
+import gzip
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from recipe_app import init_db, get_engine, session_scope, check_cooking_time, RecipeService, PAGE_SIZE
+
+DEFAULT_WORKERS = 8
+KEEP_ALIVE_TIMEOUT = 5  # seconds an idle connection may hold a worker
+GZIP_MIN_SIZE = 1024    # bytes; smaller responses aren't worth compressing
+MAX_PAGE_SIZE = 1000    # largest limit accepted when listing recipes
+MAX_BODY_SIZE = 65536   # bytes accepted in a request body
+
+RECIPE_PATH = re.compile(r'^/recipes/(\d+)$')
+
+
+class ApiError(Exception):
+    """Error answered with an HTTP status and a JSON error message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def query_int(query, name, default):
+    """Return an integer query parameter, or the default if it is missing"""
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        return int(values[0])
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Query parameter '{name}' must be an integer.")
+
+
+def recipe_changes(body, required=False):
+    """
+    Return the recipe fields of a request body as keyword arguments for RecipeService
+
+    Args:
+        required (bool): True if name, cooking_time and ingredients must all be present
+    """
+    if not isinstance(body, dict):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object.")
+
+    changes = {}
+    if 'name' in body:
+        if not isinstance(body['name'], str):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "'name' must be a string.")
+        changes['name'] = body['name'].strip()
+    if 'cooking_time' in body:
+        # Same rule as the service; its ValueError is answered with 400
+        check_cooking_time(body['cooking_time'])
+        changes['cooking_time'] = body['cooking_time']
+    if 'ingredients' in body:
+        ingredients = body['ingredients']
+        if not isinstance(ingredients, list) or not all(isinstance(item, str) for item in ingredients):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "'ingredients' must be a list of strings.")
+        changes['ingredients'] = ingredients
+
+    if required:
+        missing = [field for field in ('name', 'cooking_time', 'ingredients') if field not in changes]
+        if missing:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Missing fields: {', '.join(missing)}.")
+    elif not changes:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Nothing to update.")
+    return changes
+
+
+def handle(service, method, path, query, body):
+    """
+    Run one API request against a RecipeService
+
+    Returns:
+        tuple: (HTTP status, JSON-serializable payload or None)
+    """
+    if path == '/recipes' and method == 'GET':
+        limit = query_int(query, 'limit', PAGE_SIZE)
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"'limit' must be between 1 and {MAX_PAGE_SIZE}.")
+        recipes = service.list(after_id=query_int(query, 'after_id', 0), limit=limit)
+        return HTTPStatus.OK, [recipe._asdict() for recipe in recipes]
+
+    if path == '/recipes' and method == 'POST':
+        recipe = service.create(**recipe_changes(body, required=True))
+        return HTTPStatus.CREATED, recipe._asdict()
+
+    if path == '/recipes/search' and method == 'GET':
+        include = query.get('ingredient', [])
+        if not include:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Give at least one 'ingredient' to search for.")
+        match_all = query.get('match', ['any'])[0] == 'all'
+        recipes = service.search(include, match_all=match_all, exclude=query.get('exclude', []))
+        return HTTPStatus.OK, [recipe._asdict() for recipe in recipes]
+
+    if path == '/ingredients' and method == 'GET':
+        return HTTPStatus.OK, [
+            {'ingredient': ingredient, 'recipe_count': recipe_count}
+            for ingredient, recipe_count in service.ingredients()
+        ]
+
+    match = RECIPE_PATH.match(path)
+    if match:
+        recipe_id = int(match.group(1))
+        if method == 'GET':
+            recipe = service.get(recipe_id)
+        elif method == 'PATCH':
+            recipe = service.update(recipe_id, **recipe_changes(body))
+        elif method == 'DELETE':
+            if not service.delete(recipe_id):
+                raise ApiError(HTTPStatus.NOT_FOUND, "Recipe not found.")
+            return HTTPStatus.NO_CONTENT, None
+        else:
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not allowed here.")
+        if recipe is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, "Recipe not found.")
+        return HTTPStatus.OK, recipe._asdict()
+
+    if path in ('/recipes', '/recipes/search', '/ingredients'):
+        raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not allowed here.")
+    raise ApiError(HTTPStatus.NOT_FOUND, "No such endpoint.")
+
+
+class RecipeRequestHandler(BaseHTTPRequestHandler):
+    """Request handler translating HTTP requests into RecipeService calls"""
+
+    protocol_version = 'HTTP/1.1'  # keep connections alive between requests
+    timeout = KEEP_ALIVE_TIMEOUT
+    disable_nagle_algorithm = True  # don't hold back small responses on kept-alive connections
+    server_version = 'RecipeServer/1.0'
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PATCH(self):
+        self.dispatch('PATCH')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def read_body(self):
+        """Return the decoded JSON request body, or None if there is none"""
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # The body's end is unknown, so the connection can't be reused
+            self.close_connection = True
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length header.")
+        if length > MAX_BODY_SIZE:
+            self.close_connection = True
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body is too large.")
+        if not length:
+            return None
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Request body is not valid JSON.")
+
+    def dispatch(self, method):
+        """Handle one request in its own database session and send the JSON response"""
+        url = urlsplit(self.path)
+        try:
+            body = self.read_body()
+            with session_scope() as db_session:
+                status, payload = handle(RecipeService(db_session), method, url.path, parse_qs(url.query), body)
+        except ApiError as err:
+            status, payload = err.status, {'error': str(err)}
+        except ValueError as err:
+            status, payload = HTTPStatus.BAD_REQUEST, {'error': str(err)}
+        except SQLAlchemyError:
+            self.log_error("Database error on %s %s", method, self.path)
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "Database error."}
+        self.send_json(status, payload)
+
+    def send_json(self, status, payload):
+        """Send a JSON response, gzipped when it is large and the client accepts gzip"""
+        self.send_response(status)
+        body = b''
+        if payload is not None:
+            body = json.dumps(payload).encode('utf-8')
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Vary', 'Accept-Encoding')
+            if len(body) >= GZIP_MIN_SIZE and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                body = gzip.compress(body, compresslevel=5)
+                self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Only log requests when the server runs with --verbose"""
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class WorkerPoolHTTPServer(HTTPServer):
+    """HTTPServer handling each connection on one thread of a fixed-size worker pool"""
+
+    request_queue_size = 128  # pending connections the operating system queues
+
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKERS, verbose=False):
+        super().__init__(server_address, handler_class)
+        self.verbose = verbose
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='recipe-worker')
+
+    def process_request(self, request, client_address):
+        """Hand the connection to a worker instead of handling it in the accept loop"""
+        self.executor.submit(self.process_request_in_worker, request, client_address)
+
+    def process_request_in_worker(self, request, client_address):
+        """Serve every request of one connection, then close it"""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        """Stop accepting connections and wait for the workers to finish"""
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+def main():
+    """Parse command-line arguments and serve the API until interrupted"""
+    parser = argparse.ArgumentParser(description="Serve the recipe application as an HTTP/JSON API.")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on")
+    parser.add_argument('--port', type=int, default=8000, help="Port to listen on")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Number of worker threads")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args()
+
+    init_db()
+    server = WorkerPoolHTTPServer((args.host, args.port), RecipeRequestHandler, args.workers, args.verbose)
+    print(f"Serving recipes on http://{args.host}:{args.port} with {args.workers} workers (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping server...")
+    finally:
+        server.server_close()
+        get_engine().dispose()
+
+
+if __name__ == "__main__":
+    main()
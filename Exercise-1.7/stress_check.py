@@ -0,0 +1,283 @@
+"""
+Concurrency stress check for the recipe application
+
+Starts several threads that create, search, edit and delete recipes at the
+same time through RecipeService, each thread working in its own session
+from the scoped module session. Afterwards it checks that the database
+is still consistent:
+
+    - every recipe a thread kept has the name, ingredients, cooking time
+      and difficulty that thread last gave it, and deleted recipes are gone
+    - the ingredient index holds exactly the ingredients of each recipe
+    - the catalog counts equal the number of indexed recipes per ingredient
+    - every stored difficulty follows the difficulty rule
+    - cached search results equal a fresh search
+    - the cached record of every recipe ever created equals the stored one
+
+Reader threads keep getting recipes the other threads are editing and
+deleting, so records loaded during a write go through the shared recipe
+cache.
+
+Exits with status 1 when a check fails or an operation raised an error.
+
+Usage:
+    python stress_check.py --threads 8 --readers 4 --operations 200
+
+Runs against a new SQLite file in a temporary directory unless
+--database-url is given.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+INGREDIENTS = [
+    'Flour', 'Sugar', 'Egg', 'Milk', 'Butter', 'Salt', 'Water', 'Yeast',
+    'Tomato', 'Onion', 'Garlic', 'Rice', 'Cheese', 'Basil', 'Lemon', 'Honey'
+]
+
+# Relative weights of the operations each thread picks from
+OPERATION_WEIGHTS = {'create': 4, 'get': 3, 'search': 3, 'edit': 3, 'delete': 1}
+
+# Readers pick from the ids of the last READ_WINDOW edits and deletes, and
+# wait READ_DELAY seconds after loading a recipe before caching it
+READ_WINDOW = 8
+READ_DELAY = 0.02
+
+
+def random_recipe(rng):
+    """Return (cooking_time, ingredients) of a random recipe"""
+    return rng.randint(1, 60), rng.sample(INGREDIENTS, rng.randint(1, 6))
+
+
+def worker(app, number, operations, seed, created_ids, busy_ids, results):
+    """
+    Run random operations on the recipes of one thread
+
+    Every thread only edits and deletes the recipes it created, so it knows
+    what each of them must look like at the end. Searches and the catalog
+    are shared by all threads. Created ids are added to created_ids, and
+    the id of a recipe about to be edited or deleted to busy_ids, for the
+    readers.
+    """
+    rng = random.Random(seed + number)
+    service = app.RecipeService()  # works in this thread's scoped session
+    expected = {}  # recipe id -> (name, ingredients, cooking_time) this thread stored last
+    errors = []
+    counts = Counter()
+    operation_names = list(OPERATION_WEIGHTS)
+    weights = list(OPERATION_WEIGHTS.values())
+
+    for step in range(operations):
+        operation = rng.choices(operation_names, weights)[0]
+        if operation != 'create' and not expected:
+            operation = 'create'
+        try:
+            if operation == 'create':
+                name = f"Stress {number}-{step}"
+                cooking_time, ingredients = random_recipe(rng)
+                recipe = service.create(name, cooking_time, ingredients)
+                expected[recipe.id] = (name, app.normalize_ingredients(ingredients), cooking_time)
+                created_ids.append(recipe.id)
+            elif operation == 'get':
+                recipe_id = rng.choice(list(expected))
+                recipe = service.get(recipe_id)
+                name, ingredients, cooking_time = expected[recipe_id]
+                if recipe is None or (recipe.name, recipe.cooking_time) != (name, cooking_time):
+                    errors.append(f"thread {number}: recipe {recipe_id} read back as {recipe}")
+            elif operation == 'search':
+                include = rng.sample(INGREDIENTS, rng.randint(1, 2))
+                service.search(include, match_all=rng.random() < 0.5)
+            elif operation == 'edit':
+                recipe_id = rng.choice(list(expected))
+                busy_ids.append(recipe_id)
+                name, _, _ = expected[recipe_id]
+                cooking_time, ingredients = random_recipe(rng)
+                # One attribute at a time, so readers can load the recipe between the two writes
+                if (service.update(recipe_id, cooking_time=cooking_time) is None
+                        or service.update(recipe_id, ingredients=ingredients) is None):
+                    errors.append(f"thread {number}: recipe {recipe_id} vanished before its edit")
+                expected[recipe_id] = (name, app.normalize_ingredients(ingredients), cooking_time)
+            elif operation == 'delete':
+                recipe_id = rng.choice(list(expected))
+                busy_ids.append(recipe_id)
+                if not service.delete(recipe_id):
+                    errors.append(f"thread {number}: recipe {recipe_id} vanished before its delete")
+                del expected[recipe_id]
+            counts[operation] += 1
+        except Exception as err:
+            # Leave the session usable for the next operation
+            app.session.rollback()
+            errors.append(f"thread {number}: {operation} failed: {err!r}")
+
+    app.session.remove()
+    results[number] = (expected, errors, counts)
+
+
+def reader(app, number, seed, busy_ids, done, results):
+    """
+    Get the recipes the writers are editing or deleting right now until they are done
+
+    Reads go through the shared recipe cache like RecipeService.get, but a
+    miss waits READ_DELAY seconds between loading the row and handing it to
+    the cache, so writes often commit and invalidate the recipe meanwhile.
+    """
+    rng = random.Random(seed - number - 1)
+    errors = []
+    reads = 0
+
+    def slow_loader(recipe_id):
+        def load():
+            recipe = app.session.get(app.Recipe, recipe_id)
+            record = app.recipe_record(recipe) if recipe is not None else None
+            app.session.rollback()  # end the read transaction so writers aren't held up
+            time.sleep(READ_DELAY)
+            return record
+        return load
+
+    while not done.is_set():
+        if not busy_ids:
+            time.sleep(0.001)
+            continue
+        try:
+            recipe_id = rng.choice(busy_ids[-READ_WINDOW:])
+            app.recipe_cache.get(recipe_id, slow_loader(recipe_id))
+            reads += 1
+        except Exception as err:
+            app.session.rollback()
+            errors.append(f"reader {number}: get failed: {err!r}")
+
+    app.session.remove()
+    results[f"reader {number}"] = ({}, errors, Counter(read=reads))
+
+
+def check_consistency(app, expected, created_ids):
+    """
+    Compare the database and the recipe cache with the recipes the threads kept
+
+    Returns:
+        list: Descriptions of every inconsistency found
+    """
+    problems = []
+    with app.session_scope() as db_session:
+        recipes = {recipe.id: recipe for recipe in db_session.query(app.Recipe)}
+
+        # Recipes kept by the threads, and no leftovers of deleted ones
+        for recipe_id, (name, ingredients, cooking_time) in expected.items():
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                problems.append(f"recipe {recipe_id} ({name}) is missing")
+            elif (recipe.name, recipe.return_ingredients_as_list(), recipe.cooking_time) != (
+                    name, ingredients, cooking_time):
+                problems.append(f"recipe {recipe_id} is {recipe!r}, expected {name}, {ingredients}, {cooking_time}")
+        for recipe in recipes.values():
+            if recipe.name.startswith("Stress ") and recipe.id not in expected:
+                problems.append(f"deleted recipe {recipe.id} ({recipe.name}) is still stored")
+
+        # Difficulty and ingredient index of every recipe
+        indexed = {}
+        for entry in db_session.query(app.RecipeIngredient):
+            indexed.setdefault(entry.recipe_id, set()).add(entry.ingredient)
+        for recipe in recipes.values():
+            ingredients = recipe.return_ingredients_as_list()
+            if recipe.difficulty != app.difficulty_level(recipe.cooking_time, len(ingredients)):
+                problems.append(f"recipe {recipe.id} has difficulty {recipe.difficulty}")
+            if indexed.pop(recipe.id, set()) != set(map(app.ingredient_key, ingredients)):
+                problems.append(f"ingredient index of recipe {recipe.id} doesn't match {ingredients}")
+        for recipe_id in indexed:
+            problems.append(f"ingredient index has rows for deleted recipe {recipe_id}")
+
+        # Catalog counts against the index
+        index_counts = Counter(
+            app.ingredient_key(ingredient)
+            for recipe in recipes.values() for ingredient in recipe.return_ingredients_as_list()
+        )
+        catalog_counts = dict(db_session.query(app.IngredientCatalog.ingredient, app.IngredientCatalog.recipe_count))
+        if catalog_counts != dict(index_counts):
+            difference = {
+                ingredient: (catalog_counts.get(ingredient), index_counts.get(ingredient))
+                for ingredient in set(catalog_counts) | set(index_counts)
+                if catalog_counts.get(ingredient) != index_counts.get(ingredient)
+            }
+            problems.append(f"catalog counts differ from the index (catalog, index): {difference}")
+
+        # Cached searches against fresh ones
+        service = app.RecipeService(db_session)
+        for ingredient in INGREDIENTS:
+            cached = [recipe.id for recipe in service.search([ingredient])]
+            fresh = [recipe.id for recipe in app.query_recipes_by_ingredients([ingredient], db_session=db_session)]
+            if cached != fresh:
+                problems.append(f"cached search for {ingredient} returned {len(cached)} recipes, expected {len(fresh)}")
+
+        # Cached records against the stored rows, including deleted recipes
+        for recipe_id in set(created_ids):
+            cached = service.get(recipe_id)
+            stored = app.recipe_record(recipes[recipe_id]) if recipe_id in recipes else None
+            if cached != stored:
+                problems.append(f"recipe cache holds {cached} for recipe {recipe_id}, stored is {stored}")
+    return problems
+
+
+def main():
+    """Run the stress threads, then check the database and report"""
+    parser = argparse.ArgumentParser(description="Run concurrent recipe operations and check consistency.")
+    parser.add_argument('--threads', type=int, default=8, help="Number of concurrent threads")
+    parser.add_argument('--readers', type=int, default=4, help="Threads reading recipes of the other threads")
+    parser.add_argument('--operations', type=int, default=200, help="Operations per thread")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed")
+    parser.add_argument('--database-url', help="Database to use instead of a temporary SQLite file")
+    args = parser.parse_args()
+
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'stress.db')}"
+    os.environ['RECIPE_DATABASE_URL'] = args.database_url
+    import recipe_app as app  # reads RECIPE_DATABASE_URL on import
+    app.init_db()
+
+    results = {}
+    created_ids = []
+    busy_ids = []
+    done = threading.Event()
+    threads = [
+        threading.Thread(target=worker, args=(app, number, args.operations, args.seed, created_ids, busy_ids, results))
+        for number in range(args.threads)
+    ]
+    readers = [
+        threading.Thread(target=reader, args=(app, number, args.seed, busy_ids, done, results))
+        for number in range(args.readers)
+    ]
+    start = time.perf_counter()
+    for thread in threads + readers:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    for thread in readers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    expected, errors, counts = {}, [], Counter()
+    for thread_expected, thread_errors, thread_counts in results.values():
+        expected.update(thread_expected)
+        errors.extend(thread_errors)
+        counts.update(thread_counts)
+    print(f"{sum(counts.values())} operations on {args.threads} + {args.readers} threads in {elapsed:.2f}s "
+          f"({', '.join(f'{name}: {count}' for name, count in sorted(counts.items()))})")
+    print(f"Database: {args.database_url}")
+
+    problems = errors + check_consistency(app, expected, created_ids)
+    app.get_engine().dispose()
+    for problem in problems:
+        print(f"FAIL {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"OK   {len(expected)} recipes consistent")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,490 @@
+"""
+Benchmark of the four recipe storage backends
+
+    file    Exercise-1.4  indexed append-only recipe file (recipe_store.py)
+    memory  Exercise-1.5  CompactRecipe objects in a RecipeCollection (recipe_oop.py)
+    dbapi   Exercise-1.6  raw DB-API SQL (recipe_mysql.py)
+    orm     Exercise-1.7  SQLAlchemy ORM (recipe_app.py, recipe_import.py)
+
+Every backend gets the same synthetic recipes, whose ingredients are drawn
+from a vocabulary with Zipfian popularity (a few very common ingredients,
+a long tail of rare ones), and the same Zipfian stream of single-ingredient
+searches. For each backend the benchmark measures insert throughput,
+search latency percentiles, the time to list every recipe and the peak
+resident memory. Each backend runs in its own process, so the peak memory
+of one doesn't include the others.
+
+The dbapi backend calls recipe_mysql.py on MySQL when
+RECIPE_BENCH_MYSQL_DATABASE names a scratch database; otherwise its pool
+hands out SQLite stand-in connections that translate the few MySQL-only
+constructs, so the same functions and statements run either way
+(mysql.connector must be installed in both cases). The
+orm backend uses RECIPE_BENCH_DATABASE_URL if set, else a SQLite file.
+The benchmark empties the recipe tables of those databases first.
+
+Usage:
+    python benchmarks/recipe_benchmark.py
+    python benchmarks/recipe_benchmark.py --count 50000 --vocabulary 2000 --zipf 1.2
+    python benchmarks/recipe_benchmark.py --backends file orm --output results.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime, timezone
+from itertools import accumulate, islice
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, peak memory is then not reported
+    resource = None
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Exercise folder holding the code of each backend
+BACKEND_DIRECTORIES = {
+    'file': 'Exercise-1.4',
+    'memory': 'Exercise-1.5',
+    'dbapi': 'Exercise-1.6',
+    'orm': 'Exercise-1.7',
+}
+
+for directory in ('shared', *BACKEND_DIRECTORIES.values()):
+    sys.path.insert(0, os.path.join(REPO_ROOT, directory))
+
+from difficulty import DIFFICULTY_LEVELS, difficulty_code  # noqa: E402  (shared/difficulty.py)
+
+
+def zipf_sampler(vocabulary, exponent, rng):
+    """Return a function drawing one word of the vocabulary, the word of rank r with weight 1 / r ** exponent"""
+    cum_weights = list(accumulate(1 / rank ** exponent for rank in range(1, len(vocabulary) + 1)))
+    return lambda: rng.choices(vocabulary, cum_weights=cum_weights)[0]
+
+
+def make_vocabulary(vocabulary_size):
+    """Return the ingredient names, most popular first"""
+    return [f"Ingredient {rank}" for rank in range(1, vocabulary_size + 1)]
+
+
+def make_recipes(count, vocabulary_size, exponent, seed, min_ingredients=2, max_ingredients=8):
+    """Return count recipe dictionaries with 'name', 'cooking_time' and 'ingredients' keys"""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size)
+    draw = zipf_sampler(vocabulary, exponent, rng)
+    max_ingredients = min(max_ingredients, vocabulary_size)
+    min_ingredients = min(min_ingredients, max_ingredients)
+
+    recipes = []
+    for number in range(count):
+        wanted = rng.randint(min_ingredients, max_ingredients)
+        ingredients = {}
+        while len(ingredients) < wanted:
+            ingredients.setdefault(draw(), None)
+        recipes.append({
+            'name': f"Recipe {number}",
+            'cooking_time': rng.randint(1, 120),
+            'ingredients': list(ingredients)
+        })
+    return recipes
+
+
+def make_queries(count, vocabulary_size, exponent, seed):
+    """Return count ingredient names to search for, with the same Zipfian popularity as the recipes"""
+    draw = zipf_sampler(make_vocabulary(vocabulary_size), exponent, random.Random(seed + 1))
+    return [draw() for _ in range(count)]
+
+
+def chunks(items, size):
+    """Generator yielding lists of up to size items"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Backends
+# Each one has setup(workdir), insert(recipes, chunk_size), search(ingredient),
+# list_all() returning the number of recipes listed, and close()
+
+class FileBackend:
+    """Exercise-1.4: indexed append-only recipe file searched through mmap"""
+
+    def setup(self, workdir):
+        import recipe_store
+        self.store = recipe_store
+        self.filename = os.path.join(workdir, 'recipes.bin')
+        self.store.open_store(self.filename)
+        self.recipe_file = None
+
+    def insert(self, recipes, chunk_size):
+        for chunk in chunks(recipes, chunk_size):
+            self.store.append_recipes(self.filename, [
+                dict(recipe, difficulty=DIFFICULTY_LEVELS[difficulty_code(recipe['cooking_time'], len(recipe['ingredients']))])
+                for recipe in chunk
+            ])
+
+    def search(self, ingredient):
+        if self.recipe_file is None:
+            self.recipe_file = self.store.RecipeFile(self.filename)
+        return self.recipe_file.find(ingredient)
+
+    def list_all(self):
+        return sum(1 for _ in self.store.iter_recipes(self.filename))
+
+    def close(self):
+        if self.recipe_file is not None:
+            self.recipe_file.close()
+
+
+class MemoryBackend:
+    """Exercise-1.5: CompactRecipe objects indexed by a RecipeCollection"""
+
+    def setup(self, workdir):
+        import recipe_oop
+        self.recipe_class = recipe_oop.CompactRecipe
+        self.collection = recipe_oop.RecipeCollection()
+
+    def insert(self, recipes, chunk_size):
+        for data in recipes:
+            recipe = self.recipe_class(data['name'])
+            recipe.add_ingredients(*data['ingredients'])
+            recipe.set_cooking_time(data['cooking_time'])
+            self.collection.add(recipe)
+
+    def search(self, ingredient):
+        return self.collection.search(all_of=[ingredient])
+
+    def list_all(self):
+        return sum(1 for recipe in self.collection.recipes if (
+            recipe.get_name(), recipe.get_cooking_time(), recipe.get_ingredients(), recipe.get_difficulty()
+        ))
+
+    def close(self):
+        pass
+
+
+class StandInCursor:
+    """sqlite3 cursor accepting the MySQL statements of recipe_mysql.py"""
+
+    # MySQL-only syntax used by recipe_mysql.py and its SQLite equivalent
+    TRANSLATIONS = (
+        ('%s', '?'),
+        ("CONCAT(', ', ingredients, ', ')", "(', ' || ingredients || ', ')"),
+        ('ON DUPLICATE KEY UPDATE recipe_count = recipe_count + VALUES(recipe_count)',
+         'ON CONFLICT(name) DO UPDATE SET recipe_count = recipe_count + excluded.recipe_count'),
+    )
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def translate(self, statement):
+        for mysql_syntax, sqlite_syntax in self.TRANSLATIONS:
+            statement = statement.replace(mysql_syntax, sqlite_syntax)
+        return statement
+
+    def execute(self, statement, params=()):
+        self.cursor.execute(self.translate(statement), params)
+
+    def executemany(self, statement, seq_of_params):
+        self.cursor.executemany(self.translate(statement), seq_of_params)
+
+    def __getattr__(self, name):
+        # fetchone(), fetchall(), rowcount, lastrowid and close() as in sqlite3
+        return getattr(self.cursor, name)
+
+
+class StandInConnection:
+    """SQLite connection standing in for a mysql.connector one in recipe_mysql.py's pool"""
+
+    def __init__(self, filename):
+        self.conn = sqlite3.connect(filename)
+
+    def cursor(self, buffered=False):
+        return StandInCursor(self.conn.cursor())
+
+    def __getattr__(self, name):
+        # commit(), rollback() and close() as in sqlite3
+        return getattr(self.conn, name)
+
+
+class DbApiBackend:
+    """
+    Exercise-1.6: create_recipes_batch() and RecipeService of recipe_mysql.py
+    On MySQL when RECIPE_BENCH_MYSQL_DATABASE is set, else on a SQLite
+    stand-in connection behind the same connection pool
+    """
+
+    def setup(self, workdir):
+        import recipe_mysql
+        from connection_pool import ConnectionPool
+        self.recipe_mysql = recipe_mysql
+
+        database = os.environ.get('RECIPE_BENCH_MYSQL_DATABASE')
+        if database:
+            recipe_mysql.DB_NAME = database
+            recipe_mysql.init_database()
+        else:
+            # SQLite stand-in with the same tables and indexes
+            filename = os.path.join(workdir, 'dbapi.db')
+            with contextlib.closing(sqlite3.connect(filename)) as conn:
+                conn.executescript("""
+                CREATE TABLE Recipes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name VARCHAR(50),
+                    ingredients VARCHAR(255),
+                    cooking_time INT,
+                    difficulty VARCHAR(20)
+                );
+                CREATE INDEX ix_recipes_name ON Recipes (name);
+                CREATE INDEX ix_recipes_cooking_time ON Recipes (cooking_time);
+                CREATE INDEX ix_recipes_difficulty_cooking_time ON Recipes (difficulty, cooking_time);
+                CREATE TABLE Ingredients (
+                    name VARCHAR(255) PRIMARY KEY,
+                    recipe_count INT NOT NULL DEFAULT 0
+                );
+                """)
+            recipe_mysql.pool = ConnectionPool(
+                lambda: StandInConnection(filename),
+                pool_size=recipe_mysql.POOL_SIZE,
+                max_overflow=recipe_mysql.POOL_MAX_OVERFLOW,
+                timeout=recipe_mysql.POOL_TIMEOUT,
+                recycle=recipe_mysql.POOL_RECYCLE,
+                pre_ping=recipe_mysql.POOL_PRE_PING
+            )
+
+        self.service = recipe_mysql.RecipeService(recipe_mysql.pool)
+        with self.service.transaction() as cursor:
+            cursor.execute("DELETE FROM Recipes")
+            cursor.execute("DELETE FROM Ingredients")
+
+    def insert(self, recipes, chunk_size):
+        self.recipe_mysql.create_recipes_batch(recipes, batch_size=chunk_size)
+
+    def search(self, ingredient):
+        # Time the query itself, not a search cache hit
+        self.recipe_mysql.search_cache.bump_generation()
+        return self.service.search(ingredient)
+
+    def list_all(self):
+        return len(self.service.list())
+
+    def close(self):
+        self.recipe_mysql.pool.dispose()
+
+
+class OrmBackend:
+    """
+    Exercise-1.7: SQLAlchemy ORM with the ingredient index tables
+    On RECIPE_BENCH_DATABASE_URL when set, else on a SQLite file
+    """
+
+    def setup(self, workdir):
+        os.environ['RECIPE_DATABASE_URL'] = os.environ.get(
+            'RECIPE_BENCH_DATABASE_URL', 'sqlite:///' + os.path.join(workdir, 'orm.db')
+        )
+        import recipe_app
+        import recipe_import
+        self.app = recipe_app
+        self.importer = recipe_import
+        recipe_app.init_db()
+
+        # Start from empty tables (children first for the foreign key)
+        for model in (recipe_app.RecipeIngredient, recipe_app.IngredientCatalog, recipe_app.Recipe):
+            recipe_app.session.query(model).delete()
+        recipe_app.session.commit()
+
+    def insert(self, recipes, chunk_size):
+        for chunk in chunks(recipes, chunk_size):
+            rows, ingredient_lists = zip(*map(self.importer.prepare_record, chunk))
+            self.importer.insert_chunk(list(rows), list(ingredient_lists))
+
+    def search(self, ingredient):
+        return self.app.query_recipes_by_ingredients([ingredient]).all()
+
+    def list_all(self):
+        return sum(1 for _ in self.app.stream_all_recipes())
+
+    def close(self):
+        self.app.session.close()
+        self.app.get_engine().dispose()
+
+
+BACKENDS = {
+    'file': FileBackend,
+    'memory': MemoryBackend,
+    'dbapi': DbApiBackend,
+    'orm': OrmBackend,
+}
+
+
+def peak_rss_mb():
+    """Return the peak resident memory of this process in MB, or None where it can't be read"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_backend(name, args, workdir):
+    """
+    Run the whole benchmark for one backend in this process
+
+    Returns:
+        dict: The measurements of the backend
+    """
+    recipes = make_recipes(args.count, args.vocabulary, args.zipf, args.seed)
+    queries = make_queries(args.queries, args.vocabulary, args.zipf, args.seed)
+    rss_before = peak_rss_mb()
+    backend = BACKENDS[name]()
+
+    # The backends print setup messages; keep stdout for the JSON result
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        backend.setup(workdir)
+
+        start = time.perf_counter()
+        backend.insert(recipes, args.chunk_size)
+        insert_seconds = time.perf_counter() - start
+
+        latencies = []
+        result_sizes = []
+        for ingredient in queries:
+            start = time.perf_counter()
+            result_sizes.append(len(backend.search(ingredient)))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        listed = backend.list_all()
+        list_seconds = time.perf_counter() - start
+
+        backend.close()
+
+    percentiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'insert_seconds': insert_seconds,
+        'insert_recipes_per_second': args.count / insert_seconds if insert_seconds else None,
+        'search_ms_p50': percentiles[49],
+        'search_ms_p95': percentiles[94],
+        'search_ms_p99': percentiles[98],
+        'search_ms_mean': statistics.fmean(latencies),
+        'search_mean_results': statistics.fmean(result_sizes),
+        'search_results_crc': zlib.crc32(json.dumps(result_sizes).encode()),
+        'list_seconds': list_seconds,
+        'listed_recipes': listed,
+        'rss_before_mb': rss_before,
+        'peak_rss_mb': peak_rss_mb(),
+        'sqlite_stand_in': (
+            (name == 'dbapi' and not os.environ.get('RECIPE_BENCH_MYSQL_DATABASE'))
+            or (name == 'orm' and not os.environ.get('RECIPE_BENCH_DATABASE_URL'))
+        ),
+    }
+
+
+def run_in_subprocess(name, args, workdir):
+    """Run one backend in a fresh Python process and return its measurements (or an error)"""
+    command = [
+        sys.executable, os.path.abspath(__file__), '--worker', name, '--workdir', workdir,
+        '--count', str(args.count), '--vocabulary', str(args.vocabulary), '--zipf', str(args.zipf),
+        '--queries', str(args.queries), '--chunk-size', str(args.chunk_size), '--seed', str(args.seed),
+    ]
+    completed = subprocess.run(command, capture_output=True, text=True, cwd=workdir)
+    if completed.returncode != 0:
+        error_lines = completed.stderr.strip().splitlines()
+        return {'error': error_lines[-1] if error_lines else f"exit status {completed.returncode}"}
+    return json.loads(completed.stdout)
+
+
+def print_table(results):
+    """Print one summary line per backend"""
+    print(f"{'backend':8} {'insert/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'list s':>8} {'peak MB':>8}")
+    for name, result in results.items():
+        if 'error' in result:
+            print(f"{name:8} failed: {result['error']}")
+            continue
+        peak = f"{result['peak_rss_mb']:8.1f}" if result['peak_rss_mb'] is not None else f"{'-':>8}"
+        print(
+            f"{name:8} {result['insert_recipes_per_second']:10.0f} {result['search_ms_p50']:8.3f} "
+            f"{result['search_ms_p95']:8.3f} {result['search_ms_p99']:8.3f} {result['list_seconds']:8.3f} {peak}"
+        )
+
+
+def check_results_agree(results):
+    """
+    Return True if every backend that ran found the same recipes
+
+    Compares the number of results of each search and the number of listed
+    recipes, so the timings compare the same work.
+    """
+    completed = {name: result for name, result in results.items() if 'error' not in result}
+    outcomes = {(result['search_results_crc'], result['listed_recipes']) for result in completed.values()}
+    if len(outcomes) <= 1:
+        return True
+    print("\nThe backends disagree on the results:")
+    for name, result in completed.items():
+        print(f"{name:8} {result['search_mean_results']:.1f} results per search, {result['listed_recipes']} recipes listed")
+    return False
+
+
+def main():
+    """Parse command-line arguments, run the selected backends and report the results"""
+    parser = argparse.ArgumentParser(description="Compare the recipe storage backends of the exercises.")
+    parser.add_argument('--count', type=int, default=10000, help="Number of recipes to insert")
+    parser.add_argument('--vocabulary', type=int, default=500, help="Number of distinct ingredients")
+    parser.add_argument('--zipf', type=float, default=1.1, help="Zipf exponent of ingredient popularity")
+    parser.add_argument('--queries', type=int, default=500, help="Number of ingredient searches")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="Recipes inserted per batch")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed of the synthetic data")
+    parser.add_argument('--backends', nargs='+', choices=sorted(BACKENDS), default=list(BACKENDS),
+                        help="Backends to run (default: all)")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--worker', choices=sorted(BACKENDS), help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Worker process: run one backend and print its measurements as JSON
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, args, args.workdir)))
+        return
+
+    results = {}
+    for name in args.backends:
+        with tempfile.TemporaryDirectory(prefix=f'recipe-bench-{name}-') as workdir:
+            results[name] = run_in_subprocess(name, args, workdir)
+
+    print(f"{args.count} recipes, {args.vocabulary} ingredients (Zipf {args.zipf}), {args.queries} searches")
+    print_table(results)
+    results_agree = check_results_agree(results)
+
+    if args.output:
+        report = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'parameters': {
+                'count': args.count, 'vocabulary': args.vocabulary, 'zipf': args.zipf,
+                'queries': args.queries, 'chunk_size': args.chunk_size, 'seed': args.seed,
+            },
+            'results': results,
+        }
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.output}")
+
+    if not results_agree:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
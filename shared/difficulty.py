@@ -0,0 +1,54 @@
+"""
+Recipe difficulty rule, for single recipes and whole columns of recipes
+
+Difficulty depends on two yes/no questions: is the cooking time at least
+SLOW_COOKING_TIME minutes, and are there at least MANY_INGREDIENTS
+ingredients. Each answer is one bit of a difficulty code:
+
+    code  cooking time  ingredients  difficulty
+    0     quick         few          Easy
+    1     quick         many         Medium
+    2     slow          few          Intermediate
+    3     slow          many         Hard
+
+difficulty_codes() computes the codes for whole arrays at once with NumPy,
+which is what recalculating every stored recipe after a threshold change
+uses. Without NumPy installed it falls back to a plain Python loop.
+
+Every exercise applies this one rule (the SQL versions are built from the
+same constants), which is why this module lives in the shared folder.
+"""
+
+# Thresholds of the difficulty rule
+SLOW_COOKING_TIME = 10  # minutes
+MANY_INGREDIENTS = 4
+
+# Difficulty names indexed by difficulty code
+DIFFICULTY_LEVELS = ("Easy", "Medium", "Intermediate", "Hard")
+
+
+def difficulty_code(cooking_time, num_ingredients):
+    """Return the difficulty code (0-3) of a single recipe"""
+    return 2 * (cooking_time >= SLOW_COOKING_TIME) + (num_ingredients >= MANY_INGREDIENTS)
+
+
+def difficulty_codes(cooking_times, ingredient_counts):
+    """
+    Return the difficulty codes of many recipes at once
+
+    Args:
+        cooking_times (sequence): Cooking time of each recipe in minutes
+        ingredient_counts (sequence): Number of ingredients of each recipe
+
+    Returns:
+        numpy.ndarray of uint8 codes (a list of ints without NumPy)
+    """
+    # Imported here, so scripts scoring single recipes never load NumPy
+    try:
+        import numpy as np
+    except ImportError:  # NumPy is optional, the loop gives the same result
+        return [difficulty_code(cooking_time, count) for cooking_time, count in zip(cooking_times, ingredient_counts)]
+
+    slow = np.asarray(cooking_times) >= SLOW_COOKING_TIME
+    many = np.asarray(ingredient_counts) >= MANY_INGREDIENTS
+    return (slow.astype(np.uint8) << 1) | many.astype(np.uint8)
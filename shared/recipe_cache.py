@@ -0,0 +1,274 @@
+"""
+Caches for the recipe application
+
+LRUCache keeps up to max_size entries, evicting the least recently used
+one first, and treats entries older than ttl seconds as missing. It counts
+hits and misses so the effect of the cache can be checked. Like the search
+cache below, it keeps a generation number bumped by every invalidation, so
+a value loaded while a write was invalidating is not stored.
+
+SearchResultCache stores ingredient search results keyed by the sorted
+ingredient sets of the search, compared the way the searches compare
+them (stripped and ignoring case). Instead of tracking which results a write
+affects, every create, update or delete bumps a generation number and
+results stored under an older generation count as missing. With a path it
+keeps results and the generation in a SQLite file, so several worker
+processes share both the hits and the invalidations. Results are stored as
+JSON (rows come back as lists), so reading the shared file never runs
+code from it. Hits only read the file: the time of the last use, which
+decides what is evicted, is written in one batch with the next stored
+result.
+
+Both caches are used by Exercise-1.7/recipe_app.py and SearchResultCache
+also by Exercise-1.6/recipe_mysql.py, which is why this module lives in
+the shared folder.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """A thread-safe, size-bounded LRU cache with optional time-to-live"""
+
+    def __init__(self, max_size=1000, ttl=None):
+        """
+        Initialize an LRUCache object
+
+        Args:
+            max_size (int): Maximum number of entries kept
+            ttl (float): Seconds an entry stays valid, or None for no expiry
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (value, stored_at), oldest first
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0  # bumped by invalidate() and clear()
+        self.lock = threading.Lock()
+
+    def get(self, key, loader):
+        """
+        Return the cached value for key, calling loader() to fetch it on a miss
+
+        A loader result of None (e.g. no such recipe) is returned but not cached.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (self.ttl is None or time.monotonic() - entry[1] < self.ttl):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            generation = self.generation
+
+        # Load outside the lock so slow lookups don't block other keys; a
+        # value loaded while an invalidation happened may be stale and is
+        # returned but not stored
+        value = loader()
+        if value is not None:
+            self.put(key, value, generation)
+        return value
+
+    def put(self, key, value, generation=None):
+        """
+        Store a value, evicting the least recently used entries beyond max_size
+
+        Args:
+            generation (int): Generation the value was loaded at; the value is
+                dropped if an invalidation happened since (None stores it always)
+        """
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self.entries[key] = (value, time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """Remove one entry if it is cached and drop values still being loaded"""
+        with self.lock:
+            self.generation += 1
+            self.entries.pop(key, None)
+
+    def clear(self):
+        """Remove every entry (the hit and miss counters are kept)"""
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+    def stats(self):
+        """Return a dictionary with the size and hit/miss counters of the cache"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+class SearchResultCache:
+    """Size-bounded cache of ingredient search results with generation-based invalidation"""
+
+    def __init__(self, max_size=256, path=None):
+        """
+        Initialize a SearchResultCache object
+
+        Args:
+            max_size (int): Maximum number of search results kept
+            path (str): SQLite file shared between processes, or None to cache in this process only
+        """
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.used = {}  # key -> time of hits not yet written to the shared file
+
+        if path is None:
+            self.generation = 0
+            self.entries = OrderedDict()  # key -> (generation, results), oldest first
+        else:
+            self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            with self.db:
+                self.db.execute("CREATE TABLE IF NOT EXISTS cache_generation (id INTEGER PRIMARY KEY, value INTEGER)")
+                self.db.execute("INSERT OR IGNORE INTO cache_generation VALUES (1, 0)")
+                self.db.execute(
+                    "CREATE TABLE IF NOT EXISTS search_results "
+                    "(key TEXT PRIMARY KEY, generation INTEGER, results TEXT, used_at REAL)"
+                )
+
+    @staticmethod
+    def make_key(include, match_all=False, exclude=None):
+        """
+        Return the cache key of an ingredient search
+
+        Ingredients are split on commas, stripped and casefolded, which is
+        how the recipe_app searches turn them into the ingredient keys they
+        look up, so "Salt" and "salt " share one entry; their order and
+        repetition don't matter either. Searches comparing ingredients
+        differently need a key of their own (see make_text_key()).
+        """
+        def terms(ingredients):
+            return sorted({
+                term.strip().casefold() for ingredient in ingredients for term in ingredient.split(',')
+            } - {''})
+        return json.dumps([terms(include), bool(match_all), terms(exclude or ())])
+
+    @staticmethod
+    def make_text_key(text):
+        """
+        Return the cache key of a search for recipes containing a text
+        The text is kept as is, as whether case matters depends on the database collation
+        """
+        return json.dumps(['text', text])
+
+    def get(self, key, loader):
+        """Return the cached results for key, calling loader() to run the search on a miss"""
+        with self.lock:
+            if self.path is None:
+                entry = self.entries.get(key)
+                found = entry is not None and entry[0] == self.generation
+                if found:
+                    self.entries.move_to_end(key)
+                    results = entry[1]
+            else:
+                row = self.db.execute(
+                    "SELECT r.results FROM search_results r JOIN cache_generation g "
+                    "ON g.id = 1 AND r.generation = g.value WHERE r.key = ?", (key,)
+                ).fetchone()
+                found = row is not None
+                if found:
+                    try:
+                        results = json.loads(row[0])
+                    except (TypeError, ValueError):
+                        found = False  # written in another format, search again
+                if found:
+                    self.used[key] = time.time()
+            if found:
+                self.hits += 1
+                return results
+            self.misses += 1
+            generation = self._current_generation()
+
+        # Search outside the lock; results of a search that overlapped a write
+        # are stored under the old generation and so are never served
+        results = loader()
+        self.put(key, results, generation)
+        return results
+
+    def _current_generation(self):
+        """Return the current generation number (call with the lock held)"""
+        if self.path is None:
+            return self.generation
+        return self.db.execute("SELECT value FROM cache_generation WHERE id = 1").fetchone()[0]
+
+    def put(self, key, results, generation):
+        """
+        Store search results computed at a generation, evicting the least recently used beyond max_size
+        With a shared file the results must be JSON serializable (e.g. a list of plain tuples)
+        """
+        with self.lock:
+            if self.path is None:
+                self.entries[key] = (generation, results)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+                return
+            with self.db:
+                self._write_used()
+                self.db.execute(
+                    "INSERT OR REPLACE INTO search_results VALUES (?, ?, ?, ?)",
+                    (key, generation, json.dumps(results), time.time())
+                )
+                self.db.execute(
+                    "DELETE FROM search_results WHERE key NOT IN "
+                    "(SELECT key FROM search_results ORDER BY used_at DESC LIMIT ?)", (self.max_size,)
+                )
+
+    def _write_used(self):
+        """Write the times of the hits since the last write to the shared file (call with the lock held)"""
+        if self.used:
+            self.db.executemany(
+                "UPDATE search_results SET used_at = MAX(used_at, ?) WHERE key = ?",
+                [(used_at, key) for key, used_at in self.used.items()]
+            )
+            self.used.clear()
+
+    def bump_generation(self):
+        """Invalidate every stored result; call after each write to the recipes"""
+        with self.lock:
+            if self.path is None:
+                self.generation += 1
+                self.entries.clear()
+                return
+            self.used.clear()  # every stored result is about to be deleted
+            with self.db:
+                self.db.execute("UPDATE cache_generation SET value = value + 1 WHERE id = 1")
+                self.db.execute(
+                    "DELETE FROM search_results WHERE generation < (SELECT value FROM cache_generation WHERE id = 1)"
+                )
+
+    def stats(self):
+        """Return a dictionary with the hit/miss counters of this process"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+    def close(self):
+        """Close the shared cache file, if any, after writing the pending hit times"""
+        if self.path is not None:
+            with self.lock:
+                with self.db:
+                    self._write_used()
+                self.db.close()